@@ -7,10 +7,126 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.http import FileResponse
+from django.urls import Resolver404, resolve, set_script_prefix
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
-application = get_asgi_application()
+
+class PriorityASGIHandler(ASGIHandler):
+    """
+        ASGI handler that runs the views of the hot endpoints (scans,
+        attendance list, login) on their own bounded thread pool, and every
+        other view on a second one, so slow requests can't hold every thread
+        the hot endpoints need.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.hot_executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_HOT_THREADS, thread_name_prefix='asgi-hot'
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+
+    def get_executor(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.executor
+        if match.url_name in settings.ASGI_HOT_URL_NAMES:
+            return self.hot_executor
+        return self.executor
+
+    # __call__ and get_response_headers are copies of the private internals
+    # of ASGIHandler in Django 3.0.6 (requirements.txt), they must be checked
+    # against it when Django is upgraded
+
+    async def __call__(self, scope, receive, send):
+        # Same as ASGIHandler.__call__ but choosing the executor get_response
+        # runs on
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Django can only handle ASGI/HTTP connections, not %s.'
+                % scope['type']
+            )
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        await sync_to_async(signals.request_started.send)(sender=self.__class__, scope=scope)
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            return
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(self.get_executor(request), self.get_response, request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        await self.send_response(response, send)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        # Streaming responses (e.g. exports) read the database while they are
+        # iterated, so they are iterated and closed on a single thread of the
+        # bounded executor instead of the event loop. The thread waits for
+        # each chunk to be sent, which keeps a slow client from buffering the
+        # whole response
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self.executor, self.stream_response, response, send, loop)
+
+    def stream_response(self, response, send, loop):
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            send_sync({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': self.get_response_headers(response),
+            })
+            for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    send_sync({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_sync({'type': 'http.response.body'})
+        finally:
+            response.close()
+
+    @staticmethod
+    def get_response_headers(response):
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            )
+        return response_headers
+
+
+django.setup(set_prefix=False)
+
+application = PriorityASGIHandler()
@@ -50,7 +50,7 @@ REST_FRAMEWORK = {
 
     # Authentication settings
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'attendance.authentication.JSONWebTokenClaimsAuthentication',
     ],
 
     # Permission settings
@@ -68,7 +68,7 @@ JWT_AUTH = {
     'rest_framework_jwt.utils.jwt_decode_handler',
 
     'JWT_PAYLOAD_HANDLER':
-    'rest_framework_jwt.utils.jwt_payload_handler',
+    'attendance.authentication.jwt_payload_handler',
 
     'JWT_PAYLOAD_GET_USER_ID_HANDLER':
     'rest_framework_jwt.utils.jwt_get_user_id_from_payload_handler',
@@ -95,7 +95,75 @@ JWT_AUTH = {
     'JWT_AUTH_COOKIE': None,
 }
 
+# Asynchronous scan ingestion: when enabled POST attendances/ queues the scan
+# and answers 202 Accepted with a receipt, a background thread records the
+# queued scans in batches
+ATTENDANCE_INGEST = {
+    'ENABLED': False,
+    'MAX_QUEUE_SIZE': 5000,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.5,
+    'JOURNAL_PATH': os.path.join(BASE_DIR, 'ingest_journal.jsonl'),
+}
+
+# Class sessions: a teacher opens a session (for at most MAX_DURATION seconds,
+# up to MAX_SESSIONS at once) showing a QR token rotated every TOKEN_ROTATION
+# seconds, the students check in by themselves sending it. The check-ins are
+# recorded in batches by the ingest queue
+CLASS_SESSIONS = {
+    'TOKEN_ROTATION': 15,
+    'MAX_DURATION': 3 * 60 * 60,
+    'MAX_SESSIONS': 1000,
+}
+
+# ASGI deployment (api.asgi): the views of these endpoints run on their own
+# thread pool of ASGI_HOT_THREADS, every other view on one of ASGI_THREADS
+ASGI_HOT_URL_NAMES = (
+    'attendances-list-create',
+    'attendances-batch-create',
+    'sessions-check-in',
+    'auth-login',
+    'auth-refresh',
+)
+ASGI_HOT_THREADS = int(os.environ.get('ASGI_HOT_THREADS', 4))
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 4))
+
+# Per-request instrumentation: when enabled every request is timed (total,
+# database, auth and serializers time and number of queries), the timings are
+# logged to attendance.timing and, if HEADER, sent in a Server-Timing header
+SERVER_TIMING = {
+    'ENABLED': os.environ.get('SERVER_TIMING', '') == '1',
+    'HEADER': True,
+}
+
+# On-demand profiling: the requests of admin users with an X-Profile header or
+# a profile query parameter (cpu or memory) run their view under cProfile, the
+# profiles (at most MAX_PROFILES taking MAX_BYTES) are kept in DIRECTORY
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING', '1') == '1',
+    'DIRECTORY': os.path.join(BASE_DIR, 'profiles'),
+    'MAX_PROFILES': 50,
+    'MAX_BYTES': 100 * 1024 * 1024,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'attendance.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 MIDDLEWARE = [
+    'attendance.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +171,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'attendance.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -131,8 +200,25 @@ WSGI_APPLICATION = 'api.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'api.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # connections are reused for up to CONN_MAX_AGE seconds
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            # seconds a connection waits on a locked database before failing
+            'timeout': 20,
+            # atomic blocks take the write lock when they begin
+            'transaction_mode': 'IMMEDIATE',
+            # concurrent readers with a single writer (WAL), fsync only on
+            # checkpoints and bigger page caches
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,  # in KiB
+                'temp_store': 'memory',
+            },
+        },
     }
 }
 
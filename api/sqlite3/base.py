@@ -0,0 +1,38 @@
+"""
+SQLite database backend tuned for concurrent writers.
+
+Besides the options of django.db.backends.sqlite3, its OPTIONS accept:
+
+    'pragmas': {pragma: value} applied to every new connection
+    'transaction_mode': how atomic blocks begin their transaction, DEFERRED
+        (SQLite's default), IMMEDIATE or EXCLUSIVE
+
+A deferred transaction that reads before writing fails at once with
+"database is locked" when another connection is writing, without waiting for
+the busy timeout. Immediate transactions take the write lock when they begin,
+so they wait for it instead.
+"""
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # not sqlite3.connect() arguments
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            conn.execute('PRAGMA {} = {}'.format(pragma, value))
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute('BEGIN {}'.format(self.transaction_mode))
+        else:
+            super()._start_transaction_under_autocommit()
@@ -7,3 +7,4 @@ admin.site.register(ClassTypes)
 admin.site.register(Courses)
 admin.site.register(Users, UserAdmin)
 admin.site.register(Attendances)
+admin.site.register(RefreshTokens)
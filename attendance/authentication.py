@@ -0,0 +1,86 @@
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_jwt import utils
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+from .models import Users
+from .timing import timed
+
+# user fields embedded in the token, a user built from them has every other
+# field deferred (loaded from the database only if accessed)
+USER_CLAIMS = ('user_id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+
+
+class TokenRevocationList:
+    """
+        In-memory list of users whose tokens issued up to a given time carry
+        stale claims (e.g. the courses they teach changed). It's kept per
+        process, entries are dropped once every token they cover has expired.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id):
+        now = time.time()
+        with self._lock:
+            self._revoked[user_id] = now
+            for revoked_user_id, revoked_at in list(self._revoked.items()):
+                if revoked_at + self.ttl < now:
+                    del self._revoked[revoked_user_id]
+
+    def is_revoked(self, payload):
+        revoked_at = self._revoked.get(payload.get('user_id'))
+        return revoked_at is not None and payload.get('iat', 0) <= revoked_at
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+
+
+revoked_tokens = TokenRevocationList(int(api_settings.JWT_EXPIRATION_DELTA.total_seconds()))
+
+
+def jwt_payload_handler(user):
+    payload = utils.jwt_payload_handler(user)
+    # with sub-second precision, a token issued right after a revocation (in
+    # the same second) isn't revoked
+    payload['iat'] = time.time()
+    payload['first_name'] = user.first_name
+    payload['last_name'] = user.last_name
+    payload['is_staff'] = user.is_staff
+    payload['is_superuser'] = user.is_superuser
+    payload['role'] = user.role
+    payload['teaching'] = sorted(user.teaching_course_ids)
+    return payload
+
+
+def user_from_claims(payload):
+    claims = dict(payload, id=payload['user_id'], is_active=True)
+    field_names = [field.attname for field in Users._meta.concrete_fields if field.attname in claims]
+    user = Users.from_db(DEFAULT_DB_ALIAS, field_names, [claims[field_name] for field_name in field_names])
+    user.__dict__['teaching_course_ids'] = frozenset(payload['teaching'])
+    return user
+
+
+class JSONWebTokenClaimsAuthentication(JSONWebTokenAuthentication):
+    """
+        JSON Web Token authentication that builds the user from the token
+        claims instead of loading it. Tokens without claims or with revoked
+        claims fall back to loading the user from the database.
+    """
+
+    @timed('auth')
+    def authenticate(self, request):
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, payload):
+        if all(claim in payload for claim in USER_CLAIMS + ('iat', 'teaching')) \
+                and not revoked_tokens.is_revoked(payload):
+            return user_from_claims(payload)
+        return super().authenticate_credentials(payload)
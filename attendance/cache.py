@@ -0,0 +1,98 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from .models import ClassTypes, Courses
+
+
+class ModelCache:
+    """
+        Process-level read-through cache of model instances by a unique
+        field, bounded in size (least recently used entries are evicted
+        first) and in time (entries expire after ttl seconds).
+    """
+
+    def __init__(self, model, field, max_size=1024, ttl=300):
+        self.model = model
+        self.field = field
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+            Returns the instance with field == key, raises model.DoesNotExist
+            if there is none.
+        """
+        instance = self._get_cached(key)
+        if instance is None:
+            instance = self.model.objects.get(**{self.field: key})
+            self._set(key, instance)
+        return copy.copy(instance)
+
+    def get_many(self, keys):
+        """
+            Returns {key: instance} for every key with an instance, the
+            missing ones are fetched in a single query.
+        """
+        instances = {}
+        missing_keys = []
+        for key in set(keys):
+            instance = self._get_cached(key)
+            if instance is None:
+                missing_keys.append(key)
+            else:
+                instances[key] = instance
+        if missing_keys:
+            fetched = self.model.objects.in_bulk(missing_keys, field_name=self.field)
+            for key, instance in fetched.items():
+                self._set(key, instance)
+            instances.update(fetched)
+        return {key: copy.copy(instance) for key, instance in instances.items()}
+
+    def invalidate(self, instance):
+        with self._lock:
+            for key in [key for key, (cached, _) in self._entries.items() if cached.pk == instance.pk]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _get_cached(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _set(self, key, instance):
+        with self._lock:
+            self._entries[key] = (instance, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+courses_cache = ModelCache(Courses, 'course_name')
+class_types_cache = ModelCache(ClassTypes, 'class_type')
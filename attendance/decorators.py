@@ -1,28 +1,111 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.response import Response
 from rest_framework.views import status
 
-from .models import Users
+from .models import ResourceVersions, Users
 
 
+def get_attendance_data_error(data):
+    student_id = data.get("student_id", "")
+    student_name = data.get("student_name", "")
+    course_name = data.get("course_name", "")
+    class_type = data.get("class_type", "")
+    date = data.get("date", "")
+    if not (student_id and student_name and course_name and class_type and date):
+        return "student_id, student_name, course_name, class_type and date are required to add an attendance"
+    if not all(isinstance(value, str) for value in (student_id, course_name, class_type, date, data.get("details", ""))):
+        return "student_id, course_name, class_type, date and details must be strings"
+    if not (isinstance(student_name, list) and len(student_name) == 2
+            and all(isinstance(name, str) for name in student_name)):
+        return "student_name must be a list of a first name and a last name"
+    if not Users.is_valid_student_id(student_id):
+        return "student_id is invalid"
+    return None
+
 def validate_attendance_request_data(fn):
     def decorated(*args, **kwargs):
         # args[0] == GenericView Object
-        student_id = args[0].request.data.get("student_id", "")
-        student_name = args[0].request.data.get("student_name", "")
-        course_name = args[0].request.data.get("course_name", "")
-        class_type = args[0].request.data.get("class_type", "")
-        date = args[0].request.data.get("date", "")
-        if not (student_id and student_name and course_name and class_type and date):
+        message = get_attendance_data_error(args[0].request.data)
+        if message:
+            return Response(
+                data={
+                    "message": message
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return fn(*args, **kwargs)
+    return decorated
+
+def validate_batch_attendance_request_data(fn):
+    def decorated(*args, **kwargs):
+        # args[0] == GenericView Object
+        attendances = args[0].request.data
+        if not (isinstance(attendances, list) and attendances):
             return Response(
                 data={
-                    "message": "student_id, student_name, course_name, class_type and date are required to add an attendance"
+                    "message": "a list of attendances is required to add attendances"
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if not Users.is_valid_student_id(student_id):
+        if len(attendances) > args[0].max_batch_size:
             return Response(
                 data={
-                    "message": "student_id is invalid"
+                    "message": "at most {} attendances can be added at once".format(args[0].max_batch_size)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return fn(*args, **kwargs)
+    return decorated
+
+def get_attendance_filter_error(query_params):
+    from datetime import date
+
+    dates = {}
+    for param in ("date_from", "date_to"):
+        value = query_params.get(param, "")
+        if not value:
+            continue
+        try:
+            dates[param] = date.fromisoformat(value)
+        except ValueError:
+            return "{} must be an ISO formatted date".format(param)
+    if len(dates) == 2 and dates["date_from"] > dates["date_to"]:
+        return "date_from must not be after date_to"
+    student_id = query_params.get("student_id", "")
+    if student_id and not Users.is_valid_student_id(student_id):
+        return "student_id is invalid"
+    return None
+
+def validate_attendance_filter_query_params(fn):
+    def decorated(*args, **kwargs):
+        # args[0] == GenericView Object
+        message = get_attendance_filter_error(args[0].request.query_params)
+        if message:
+            return Response(
+                data={
+                    "message": message
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return fn(*args, **kwargs)
+    return decorated
+
+def validate_users_import_request_data(fn):
+    def decorated(*args, **kwargs):
+        # args[0] == GenericView Object
+        students = args[0].request.data
+        if not (isinstance(students, list) and students):
+            return Response(
+                data={
+                    "message": "a list of students is required to import students"
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(students) > args[0].max_import_size:
+            return Response(
+                data={
+                    "message": "at most {} students can be imported at once".format(args[0].max_import_size)
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -55,23 +138,107 @@ def validate_course_request_data(fn):
                 status=status.HTTP_400_BAD_REQUEST
             )
         teachers = args[0].request.data.get("teachers", [])
-        if isinstance(teachers, list):
-            for teacher in teachers:
-                try:
-                    Users.objects.get(username=teacher)
-                except Users.DoesNotExist:
-                    return Response(
-                        data={
-                            "message": "user with username: {} does't exists".format(teacher)
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-        else:
+        if not (isinstance(teachers, list) and all(isinstance(teacher, str) for teacher in teachers)):
             return Response(
                 data={
                     "message": "teachers must be a list"
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+        # every teacher is resolved with a single query, the view gets them
+        # in args[0].teachers
+        teachers, missing = resolve_teachers(teachers)
+        if len(missing) == 1:
+            return Response(
+                data={
+                    "message": "user with username: {} does't exists".format(missing[0])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if missing:
+            return Response(
+                data={
+                    "message": "users with usernames: {} don't exist".format(", ".join(missing))
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        args[0].teachers = teachers
+        return fn(*args, **kwargs)
+    return decorated
+
+def resolve_teachers(usernames):
+    # returns the Users of the usernames (without duplicates, in order) and
+    # the usernames that don't exist
+    users = Users.get_users(usernames)
+    teachers = {}
+    missing = []
+    for username in usernames:
+        if username in users:
+            teachers.setdefault(username, users[username])
+        elif username not in missing:
+            missing.append(username)
+    return list(teachers.values()), missing
+
+def get_class_session_data_error(data):
+    from datetime import date
+
+    course_name = data.get("course_name", "")
+    class_type = data.get("class_type", "")
+    if not (course_name and class_type):
+        return "course_name and class_type are required to open a class session"
+    if not all(isinstance(value, str) for value in (course_name, class_type, data.get("details", ""))):
+        return "course_name, class_type and details must be strings"
+    try:
+        if data.get("date"):
+            date.fromisoformat(data["date"])
+    except (TypeError, ValueError):
+        return "date must be an ISO formatted date"
+    duration = data.get("duration")
+    if duration is not None and (isinstance(duration, bool) or not isinstance(duration, int) or duration <= 0):
+        return "duration must be a positive number of seconds"
+    return None
+
+def validate_class_session_request_data(fn):
+    def decorated(*args, **kwargs):
+        # args[0] == GenericView Object
+        message = get_class_session_data_error(args[0].request.data)
+        if message:
+            return Response(
+                data={
+                    "message": message
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return fn(*args, **kwargs)
     return decorated
+
+def validate_refresh_token_request_data(fn):
+    def decorated(*args, **kwargs):
+        # args[0] == GenericView Object
+        refresh_token = args[0].request.data.get("refresh_token", "")
+        if not (refresh_token and isinstance(refresh_token, str)):
+            return Response(
+                data={
+                    "message": "refresh_token is required to refresh a token"
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return fn(*args, **kwargs)
+    return decorated
+
+def condition_on_resource_version(resource):
+    # ETag and Last-Modified of the GET responses are the version of the
+    # resource, If-None-Match / If-Modified-Since get a 304 without running
+    # the view
+    def get_version(request, *args, **kwargs):
+        if not hasattr(request, "_resource_version"):
+            request._resource_version = ResourceVersions.get_version(resource)
+        return request._resource_version
+
+    def etag(request, *args, **kwargs):
+        return get_version(request).etag
+
+    def last_modified(request, *args, **kwargs):
+        return get_version(request).modified
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
@@ -0,0 +1,325 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import status
+
+from .authentication import revoked_tokens
+from .cache import class_types_cache, courses_cache
+from .decorators import get_attendance_data_error
+from .models import Attendances, ClassTypes, Courses, Users
+from .serializers import AttendancesSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def error_result(status_code, message):
+    return {
+        "status": status_code,
+        "message": message
+    }
+
+
+def record_attendance_scans(teacher, scans):
+    """
+        Records the attendance scans made by teacher resolving every student,
+        course and class type with set-based queries and writing all the
+        attendances with a single bulk_create. Returns a result for each scan.
+    """
+
+    # validate every scan, the valid ones are resolved all together below
+    results = [None] * len(scans)
+    valid_scans = []
+    for index, scan in enumerate(scans):
+        if not isinstance(scan, dict):
+            results[index] = error_result(status.HTTP_400_BAD_REQUEST, "attendance must be an object")
+            continue
+        message = get_attendance_data_error(scan)
+        if message:
+            results[index] = error_result(status.HTTP_400_BAD_REQUEST, message)
+            continue
+        try:
+            scan_date = date.fromisoformat(scan["date"])
+        except (TypeError, ValueError):
+            results[index] = error_result(status.HTTP_400_BAD_REQUEST, "date is invalid")
+            continue
+        valid_scans.append((index, scan, scan_date))
+
+    with transaction.atomic():
+        course_names = {scan["course_name"] for _, scan, _ in valid_scans}
+        courses = courses_cache.get_many(course_names)
+        teaching = set(teacher.teaching_course_ids)
+
+        missing_course_names = course_names - set(courses)
+        if missing_course_names and not teacher.is_student_user:
+            new_courses = Courses.create_courses(missing_course_names, teacher)
+            courses.update(new_courses)
+            teaching.update(course.id for course in new_courses.values())
+            # the teachers are added without m2m_changed, the taught courses
+            # embedded in the tokens of the teacher are stale
+            revoked_tokens.revoke(teacher.pk)
+
+        allowed_scans = []
+        for index, scan, scan_date in valid_scans:
+            course = courses.get(scan["course_name"])
+            if course is None:
+                results[index] = error_result(
+                    status.HTTP_400_BAD_REQUEST,
+                    "course: \"{}\" does not exist".format(scan["course_name"])
+                )
+            elif course.id not in teaching:
+                results[index] = error_result(
+                    status.HTTP_403_FORBIDDEN,
+                    PermissionDenied.default_detail
+                )
+            else:
+                allowed_scans.append((index, scan, scan_date, course))
+
+        students = {}
+        for _, scan, _, _ in allowed_scans:
+            students.setdefault(scan["student_id"], scan["student_name"])
+        students = Users.get_or_create_students(students)
+
+        class_types = class_types_cache.get_many(
+            scan["class_type"] for _, scan, _, _ in allowed_scans
+        )
+        missing_class_types = {scan["class_type"] for _, scan, _, _ in allowed_scans} - set(class_types)
+        if missing_class_types:
+            class_types.update(ClassTypes.get_or_create_class_types(missing_class_types))
+
+        scanned = [
+            (index, Attendances(
+                student=students[scan["student_id"]],
+                teacher=teacher,
+                course=course,
+                class_type=class_types[scan["class_type"]],
+                date=scan_date,
+                details=scan.get("details", "")
+            ))
+            for index, scan, scan_date, course in allowed_scans
+        ]
+
+        # scans of an already recorded attendance are no-ops. Only the keys
+        # of the scanned students in the scanned classes are read (through the
+        # (course, date) index), the attendances are loaded for the matches
+        keys = {attendance.unique_key for _, attendance in scanned}
+        existing_ids = {
+            (student_id, course_id, class_type_id, date): attendance_id
+            for attendance_id, student_id, course_id, class_type_id, date in Attendances.objects.filter(
+                course__in={attendance.course_id for _, attendance in scanned},
+                date__in={attendance.date for _, attendance in scanned},
+                student__in={attendance.student_id for _, attendance in scanned}
+            ).values_list("id", "student_id", "course_id", "class_type_id", "date")
+        }
+        existing_ids = {key: attendance_id for key, attendance_id in existing_ids.items() if key in keys}
+        existing = Attendances.objects.select_related("student", "teacher", "course", "class_type").in_bulk(
+            list(existing_ids.values())
+        )
+
+        attendances = {}
+        created_scans = []
+        repeated_scans = []
+        for index, attendance in scanned:
+            key = attendance.unique_key
+            if key in existing_ids:
+                results[index] = {
+                    "status": status.HTTP_200_OK,
+                    "data": AttendancesSerializer(existing[existing_ids[key]]).data
+                }
+            elif key in attendances:
+                # a repeat of a scan of the batch, recorded by the first one
+                repeated_scans.append((index, attendances[key]))
+            else:
+                attendances[key] = attendance
+                created_scans.append((index, attendance))
+        Attendances.objects.bulk_create(attendances.values(), ignore_conflicts=True)
+
+    for scans, status_code in [(created_scans, status.HTTP_201_CREATED), (repeated_scans, status.HTTP_200_OK)]:
+        for index, attendance in scans:
+            results[index] = {
+                "status": status_code,
+                "data": AttendancesSerializer(attendance).data
+            }
+
+    return results
+
+
+class ScanIngestQueue:
+    """
+        Bounded in-process queue of attendance scans written behind the
+        requests. A background thread drains it recording up to batch_size
+        scans per transaction. Scans still queued when the process exits are
+        spilled to a journal file and queued again the next time it starts.
+    """
+
+    def __init__(self, max_size=5000, batch_size=200, flush_interval=0.5, journal_path=None, max_receipts=50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.max_receipts = max_receipts
+        self._queue = queue.Queue(max_size)
+        self._receipts = OrderedDict()
+        self._callbacks = {}
+        self._receipts_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def put(self, teacher, scan, on_result=None):
+        """
+            Queues a scan made by teacher and returns its receipt id, raises
+            queue.Full when the queue is full. on_result is called with the
+            result of the scan once it's recorded (in this process).
+        """
+        receipt_id = uuid.uuid4().hex
+        # the receipt is set first so the flusher can't record the scan before
+        self._set_receipt(receipt_id, teacher.pk, {"status": status.HTTP_202_ACCEPTED})
+        if on_result is not None:
+            with self._receipts_lock:
+                self._callbacks[receipt_id] = on_result
+        try:
+            self._queue.put_nowait((receipt_id, teacher, scan))
+        except queue.Full:
+            with self._receipts_lock:
+                self._receipts.pop(receipt_id, None)
+                self._callbacks.pop(receipt_id, None)
+            raise
+        return receipt_id
+
+    def get_receipt(self, receipt_id, teacher):
+        with self._receipts_lock:
+            receipt = self._receipts.get(receipt_id)
+        if receipt is None or receipt[0] != teacher.pk:
+            return None
+        return receipt[1]
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._replay_journal()
+            self._thread = threading.Thread(target=self._run, name="scan-ingest", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._spill_journal()
+
+    def flush(self):
+        """
+            Records every queued scan in the calling thread.
+        """
+        while True:
+            items = self._take(block=False)
+            if not items:
+                return
+            self._record(items)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            items = self._take(block=True)
+            if items:
+                self._record(items)
+                close_old_connections()
+
+    def _take(self, block):
+        items = []
+        try:
+            if block:
+                items.append(self._queue.get(timeout=self.flush_interval))
+            while len(items) < self.batch_size:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+
+    def _record(self, items):
+        # scans are recorded per teacher, keeping their order
+        teachers = OrderedDict()
+        for receipt_id, teacher, scan in items:
+            teachers.setdefault(teacher.pk, (teacher, []))[1].append((receipt_id, scan))
+
+        for teacher, teacher_items in teachers.values():
+            try:
+                results = record_attendance_scans(teacher, [scan for _, scan in teacher_items])
+            except Exception:
+                logger.exception("Failed to record %d queued scans", len(teacher_items))
+                results = [
+                    error_result(status.HTTP_500_INTERNAL_SERVER_ERROR, "attendance could not be recorded")
+                ] * len(teacher_items)
+            for (receipt_id, _), result in zip(teacher_items, results):
+                self._set_receipt(receipt_id, teacher.pk, result)
+                with self._receipts_lock:
+                    on_result = self._callbacks.pop(receipt_id, None)
+                if on_result is not None:
+                    try:
+                        on_result(result)
+                    except Exception:
+                        logger.exception("Failed to handle the result of a queued scan")
+
+    def _set_receipt(self, receipt_id, teacher_id, result):
+        with self._receipts_lock:
+            self._receipts[receipt_id] = (teacher_id, result)
+            self._receipts.move_to_end(receipt_id)
+            while len(self._receipts) > self.max_receipts:
+                self._receipts.popitem(last=False)
+
+    def _spill_journal(self):
+        items = self._take(block=False)
+        while items:
+            # the callbacks don't outlive the process
+            with self._receipts_lock:
+                for receipt_id, _, _ in items:
+                    self._callbacks.pop(receipt_id, None)
+            if self.journal_path is None:
+                logger.error("Dropping %d queued scans, there is no ingest journal", len(items))
+                return
+            with open(self.journal_path, "a") as journal:
+                for receipt_id, teacher, scan in items:
+                    journal.write(json.dumps({"receipt": receipt_id, "teacher": teacher.pk, "scan": scan}) + "\n")
+            items = self._take(block=False)
+
+    def _replay_journal(self):
+        if self.journal_path is None or not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path) as journal:
+            entries = [json.loads(line) for line in journal if line.strip()]
+        teachers = Users.objects.in_bulk({entry["teacher"] for entry in entries})
+        os.remove(self.journal_path)
+        for index, entry in enumerate(entries):
+            teacher = teachers.get(entry["teacher"])
+            if teacher is None:
+                continue
+            try:
+                self._queue.put_nowait((entry["receipt"], teacher, entry["scan"]))
+            except queue.Full:
+                # keep the scans that don't fit for the next start
+                with open(self.journal_path, "w") as journal:
+                    journal.writelines(json.dumps(entry) + "\n" for entry in entries[index:])
+                return
+            self._set_receipt(entry["receipt"], teacher.pk, {"status": status.HTTP_202_ACCEPTED})
+
+
+ingest_queue = ScanIngestQueue(
+    max_size=settings.ATTENDANCE_INGEST["MAX_QUEUE_SIZE"],
+    batch_size=settings.ATTENDANCE_INGEST["BATCH_SIZE"],
+    flush_interval=settings.ATTENDANCE_INGEST["FLUSH_INTERVAL"],
+    journal_path=settings.ATTENDANCE_INGEST["JOURNAL_PATH"],
+)
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+DUPLICATE_FIELDS = ('student_id', 'course_id', 'class_type_id', 'date')
+
+
+def merge_duplicate_attendances(Attendances, batch_size=500):
+    """
+        Merges attendances of the same student, course, class type and date
+        into the oldest one, keeping the first non empty details. Groups are
+        merged batch_size at a time, each batch in its own transaction.
+        Returns the number of deleted attendances.
+    """
+
+    groups = list(
+        Attendances.objects
+        .values_list(*DUPLICATE_FIELDS)
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list(*DUPLICATE_FIELDS)
+        .order_by()
+    )
+
+    deleted = 0
+    for start in range(0, len(groups), batch_size):
+        batch = groups[start:start + batch_size]
+        query = Q()
+        for group in batch:
+            query |= Q(**dict(zip(DUPLICATE_FIELDS, group)))
+
+        with transaction.atomic():
+            kept = {}
+            duplicate_ids = []
+            for attendance in Attendances.objects.filter(query).order_by('id'):
+                key = tuple(getattr(attendance, field) for field in DUPLICATE_FIELDS)
+                if key not in kept:
+                    kept[key] = attendance
+                    continue
+                duplicate_ids.append(attendance.id)
+                if not kept[key].details and attendance.details:
+                    kept[key].details = attendance.details
+
+            Attendances.objects.bulk_update(kept.values(), ['details'])
+            deleted += Attendances.objects.filter(id__in=duplicate_ids).delete()[0]
+    return deleted
+
+
+class Command(BaseCommand):
+    help = 'Merges attendances of the same student, course, class type and date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of duplicated attendances groups merged per transaction'
+        )
+
+    def handle(self, *args, **options):
+        from attendance.models import Attendances
+
+        deleted = merge_duplicate_attendances(Attendances, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Merged {} duplicated attendances'.format(deleted)))
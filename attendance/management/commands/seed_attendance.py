@@ -0,0 +1,165 @@
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from attendance.models import Attendances, ClassTypes, Courses, ResourceVersions, Users
+
+DEFAULT_CLASS_TYPES = ['Conferencia', 'Clase Practica', 'Laboratorio', 'Seminario']
+TEACHER_PASSWORD = 'teacher'
+
+
+def seed_student_id(index):
+    # a valid student id: a birthday between 1995 and 2004 and 5 digits
+    birthday = date(1995, 1, 1) + timedelta(days=index % 3650)
+    return '{}{:05d}'.format(birthday.strftime('%y%m%d'), index // 3650)
+
+
+def seed_attendance(teachers=200, students=10000, courses=400, class_types=DEFAULT_CLASS_TYPES,
+                    weeks=16, start_date=date(2020, 2, 3), classes_per_week=2, courses_per_student=5,
+                    popularity=0.8, absentees=0.1, batch_size=100000, seed=0):
+    """
+        Seeds a term of attendances. Every student enrolls in
+        courses_per_student courses, picked with a Zipf-like skew towards the
+        popular ones, and attends each of their classes with a rate of their
+        own (low for the absentees ratio of them). Users, courses and class
+        types that already exist are reused. Attendances are written
+        batch_size rows per executemany and transaction.
+        Returns the number of created attendances.
+    """
+
+    rng = random.Random(seed)
+
+    teacher_usernames = ['teacher{}@matcom.uh.cu'.format(index) for index in range(teachers)]
+    student_usernames = [seed_student_id(index) for index in range(students)]
+    course_names = ['Course {}'.format(index) for index in range(courses)]
+
+    with transaction.atomic():
+        password = make_password(TEACHER_PASSWORD)
+        Users.objects.bulk_create([
+            Users(username=username, email=username, password=password, first_name='Teacher', last_name=str(index))
+            for index, username in enumerate(teacher_usernames)
+        ], ignore_conflicts=True)
+        password = make_password(None)
+        Users.objects.bulk_create([
+            Users(username=username, password=password, first_name='Student', last_name=str(index))
+            for index, username in enumerate(student_usernames)
+        ], ignore_conflicts=True)
+        Courses.objects.bulk_create([
+            Courses(course_name=course_name) for course_name in course_names
+        ], ignore_conflicts=True)
+
+        user_ids = dict(Users.objects.values_list('username', 'id'))
+        teacher_ids = [user_ids[username] for username in teacher_usernames]
+        student_ids = [user_ids[username] for username in student_usernames]
+        course_ids = dict(Courses.objects.values_list('course_name', 'id'))
+        course_ids = [course_ids[course_name] for course_name in course_names]
+
+        # every course is taught by one teacher
+        course_teachers = {course_id: teacher_ids[index % len(teacher_ids)] for index, course_id in enumerate(course_ids)}
+        Courses.teachers.through.objects.bulk_create([
+            Courses.teachers.through(courses_id=course_id, users_id=teacher_id)
+            for course_id, teacher_id in course_teachers.items()
+        ], ignore_conflicts=True)
+        # bulk_create doesn't send the signals bumping the version
+        ResourceVersions.bump('courses')
+
+        class_type_ids = ClassTypes.get_or_create_class_types(class_types)
+        class_type_ids = [class_type_ids[class_type].id for class_type in class_types]
+
+    # enrollments, course i is picked with a weight of 1 / (i + 1) ** popularity
+    weights = [1 / (index + 1) ** popularity for index in range(len(course_ids))]
+    enrolled = {course_id: [] for course_id in course_ids}
+    rates = {}
+    for student_id in student_ids:
+        picked = set()
+        for course_id in rng.choices(course_ids, weights, k=courses_per_student * 4):
+            picked.add(course_id)
+            if len(picked) == min(courses_per_student, len(course_ids)):
+                break
+        for course_id in picked:
+            enrolled[course_id].append(student_id)
+        rates[student_id] = rng.uniform(0.05, 0.4) if rng.random() < absentees else rng.uniform(0.7, 1.0)
+
+    def rows():
+        for course_id in course_ids:
+            for week in range(weeks):
+                for index in range(classes_per_week):
+                    day = start_date + timedelta(days=7 * week + index * 5 // classes_per_week)
+                    class_type_id = class_type_ids[(week * classes_per_week + index) % len(class_type_ids)]
+                    for student_id in enrolled[course_id]:
+                        if rng.random() < rates[student_id]:
+                            yield (student_id, course_teachers[course_id], course_id, class_type_id, day.isoformat(), '')
+
+    fields = [Attendances._meta.get_field(name) for name in ('student', 'teacher', 'course', 'class_type', 'date', 'details')]
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        connection.ops.insert_statement(ignore_conflicts=True),
+        connection.ops.quote_name(Attendances._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    )
+
+    created = 0
+    rows = rows()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return created
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+            created += cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = 'Seeds teachers, students, courses, class types and a term of attendances for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=200)
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--courses', type=int, default=400)
+        parser.add_argument('--class-types', nargs='+', default=DEFAULT_CLASS_TYPES)
+        parser.add_argument('--weeks', type=int, default=16, help='Length of the term')
+        parser.add_argument(
+            '--start-date', type=date.fromisoformat, default=date(2020, 2, 3),
+            help='First day of the term (YYYY-MM-DD)'
+        )
+        parser.add_argument('--classes-per-week', type=int, default=2, help='Classes of every course per week')
+        parser.add_argument('--courses-per-student', type=int, default=5)
+        parser.add_argument(
+            '--popularity', type=float, default=0.8,
+            help='Skew of the enrollments towards the first courses, 0 for none'
+        )
+        parser.add_argument(
+            '--absentees', type=float, default=0.1,
+            help='Ratio of students that miss most of their classes'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100000,
+            help='Number of attendances written per transaction'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = seed_attendance(
+            teachers=options['teachers'],
+            students=options['students'],
+            courses=options['courses'],
+            class_types=options['class_types'],
+            weeks=options['weeks'],
+            start_date=options['start_date'],
+            classes_per_week=options['classes_per_week'],
+            courses_per_student=options['courses_per_student'],
+            popularity=options['popularity'],
+            absentees=options['absentees'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS('Seeded {} attendances in {:.1f}s'.format(
+            created, time.monotonic() - started
+        )))
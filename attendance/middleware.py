@@ -0,0 +1,149 @@
+import cProfile
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import JSONWebTokenClaimsAuthentication
+from .profiling import profile_store
+from .timing import RequestTiming, current_timing
+
+logger = logging.getLogger('attendance.timing')
+
+TIMING_PHASES = ('db', 'auth', 'serializer')
+
+
+class ServerTimingMiddleware:
+    """
+        Times every request: total, database (and number of queries),
+        authentication and serializers time and the view that handled it.
+        The timings are logged to the attendance.timing logger and sent in a
+        Server-Timing header. It isn't loaded unless SERVER_TIMING['ENABLED'].
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        total = timing.elapsed()
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': timing.view,
+            'total_ms': round(total * 1000, 2),
+            'queries': timing.queries,
+        }
+        for phase in TIMING_PHASES:
+            fields[phase + '_ms'] = round(timing.durations.get(phase, 0) * 1000, 2)
+        logger.info(
+            '%(method)s %(path)s %(status)s %(view)s total=%(total_ms)sms db=%(db_ms)sms '
+            'queries=%(queries)s auth=%(auth_ms)sms serializer=%(serializer_ms)sms', fields, extra=fields
+        )
+
+        if settings.SERVER_TIMING['HEADER']:
+            metrics = ['total;dur={}'.format(fields['total_ms'])]
+            for phase in TIMING_PHASES:
+                metric = '{};dur={}'.format(phase, fields[phase + '_ms'])
+                if phase == 'db':
+                    metric += ';desc="{} queries"'.format(timing.queries)
+                metrics.append(metric)
+            if timing.view:
+                metrics.append('view;desc="{}"'.format(timing.view))
+            response['Server-Timing'] = ', '.join(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_timing.get().view = getattr(view_func, 'view_class', view_func).__name__
+
+
+class ProfilingMiddleware:
+    """
+        Runs the view of the requests of admin users with an X-Profile header
+        or a profile query parameter (cpu, or memory to trace the memory
+        allocations too) under cProfile, and stores the profile in the profile
+        store. The response has its id in a X-Profile-Id header. Any other
+        request goes through untouched. It isn't loaded unless
+        PROFILING['ENABLED'].
+    """
+
+    # tracemalloc is process wide, one request at a time traces the memory
+    memory_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = request.META.get('HTTP_X_PROFILE') or request.GET.get('profile')
+        if not mode:
+            return None
+        user = self.get_user(request)
+        if user is None or not user.is_staff:
+            return None
+
+        trace_memory = mode == 'memory' and self.memory_lock.acquire(blocking=False)
+        profiler = cProfile.Profile()
+        snapshot = None
+        started = time.perf_counter()
+        try:
+            if trace_memory:
+                tracemalloc.start()
+            response = profiler.runcall(self.render_view, view_func, request, view_args, view_kwargs)
+        finally:
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                self.memory_lock.release()
+        duration = time.perf_counter() - started
+
+        response['X-Profile-Id'] = profile_store.save(profiler, snapshot, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': getattr(view_func, 'view_class', view_func).__name__,
+            'user': user.username,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+        })
+        return response
+
+    @staticmethod
+    def render_view(view_func, request, view_args, view_kwargs):
+        response = view_func(request, *view_args, **view_kwargs)
+        # rendering (e.g. JSON encoding) is part of the profile
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+
+    @staticmethod
+    def get_user(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user
+        try:
+            user_auth = JSONWebTokenClaimsAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        return user_auth[0] if user_auth else None
@@ -0,0 +1,66 @@
+# Generated by Django 3.0.6 on 2026-10-17 19:23
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, Q
+
+DUPLICATE_FIELDS = ('student_id', 'course_id', 'class_type_id', 'date')
+
+
+def merge_duplicates(apps, schema_editor, batch_size=500):
+    # a copy of the merge_duplicate_attendances command at the time of this
+    # migration: attendances of the same student, course, class type and
+    # date are merged into the oldest one, keeping the first non empty details
+    Attendances = apps.get_model('attendance', 'Attendances')
+
+    groups = list(
+        Attendances.objects
+        .values_list(*DUPLICATE_FIELDS)
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list(*DUPLICATE_FIELDS)
+        .order_by()
+    )
+
+    for start in range(0, len(groups), batch_size):
+        batch = groups[start:start + batch_size]
+        query = Q()
+        for group in batch:
+            query |= Q(**dict(zip(DUPLICATE_FIELDS, group)))
+
+        with transaction.atomic():
+            kept = {}
+            duplicate_ids = []
+            for attendance in Attendances.objects.filter(query).order_by('id'):
+                key = tuple(getattr(attendance, field) for field in DUPLICATE_FIELDS)
+                if key not in kept:
+                    kept[key] = attendance
+                    continue
+                duplicate_ids.append(attendance.id)
+                if not kept[key].details and attendance.details:
+                    kept[key].details = attendance.details
+
+            Attendances.objects.bulk_update(kept.values(), ['details'])
+            Attendances.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendances',
+            index=models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendances',
+            index=models.Index(fields=['student', 'date'], name='attendance_student_date_idx'),
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendances',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'class_type', 'date'), name='unique_attendance'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.6 on 2026-10-17 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendances_indexes_and_unique_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshTokens',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('family', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('expires', models.DateTimeField()),
+                ('used', models.BooleanField(default=False)),
+                ('revoked', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refresh_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
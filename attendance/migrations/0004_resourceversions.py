@@ -0,0 +1,31 @@
+# Generated by Django 3.0.6 on 2026-10-17 20:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_resource_versions(apps, schema_editor):
+    ResourceVersions = apps.get_model('attendance', 'ResourceVersions')
+    ResourceVersions.objects.bulk_create([
+        ResourceVersions(resource=resource) for resource in ('class_types', 'courses')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_refreshtokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersions',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=64, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_resource_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.6 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_resourceversions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDeletions',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attendance_id', models.IntegerField()),
+                ('viewer_id', models.IntegerField(db_index=True)),
+                ('student_username', models.CharField(max_length=150)),
+                ('course_name', models.CharField(max_length=255)),
+                ('class_type', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+            ],
+        ),
+    ]
@@ -1,6 +1,13 @@
+import hashlib
+import hmac
+import secrets
+import uuid
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 class Users(AbstractUser):
@@ -50,6 +57,68 @@ class Users(AbstractUser):
             )
         return student_user
 
+    @classmethod
+    def get_or_create_students(cls, students):
+        # students: {student_id: student_name}
+        # returns {student_id: student_user} for every valid student_id
+        students = {
+            student_id: student_name for student_id, student_name in students.items()
+            if cls.is_valid_student_id(student_id)
+        }
+        student_users = cls.objects.in_bulk(list(students), field_name='username')
+        new_students = [
+            cls(
+                username=student_id,
+                password=student_id,
+                first_name=student_name[0],
+                last_name=student_name[1]
+            )
+            for student_id, student_name in students.items() if student_id not in student_users
+        ]
+        if new_students:
+            cls.objects.bulk_create(new_students, ignore_conflicts=True)
+            student_users.update(cls.objects.in_bulk(
+                [student.username for student in new_students], field_name='username'
+            ))
+        return student_users
+
+    @classmethod
+    def get_users(cls, usernames):
+        # returns {username: user} for every existing username, in one query
+        return cls.objects.in_bulk(list(usernames), field_name='username')
+
+    @classmethod
+    def import_students(cls, students):
+        # students: {student_id: (first_name, last_name)} of valid student ids
+        # returns {student_id: ("created" | "updated" | "unchanged", student_user)}
+        from django.contrib.auth.hashers import make_password
+
+        student_users = cls.objects.in_bulk(list(students), field_name='username')
+        new_students = []
+        updated_students = []
+        result = {}
+        for student_id, (first_name, last_name) in students.items():
+            student_user = student_users.get(student_id)
+            if student_user is None:
+                student_user = cls(
+                    username=student_id,
+                    password=make_password(None),
+                    first_name=first_name,
+                    last_name=last_name
+                )
+                new_students.append(student_user)
+                result[student_id] = ("created", student_user)
+            elif (student_user.first_name, student_user.last_name) != (first_name, last_name):
+                student_user.first_name = first_name
+                student_user.last_name = last_name
+                updated_students.append(student_user)
+                result[student_id] = ("updated", student_user)
+            else:
+                result[student_id] = ("unchanged", student_user)
+        cls.objects.bulk_create(new_students)
+        cls.objects.bulk_update(updated_students, ['first_name', 'last_name'])
+        return result
+
     @property
     def is_teacher_user(self):
         return Users.is_valid_teacher_email(self.username)
@@ -60,7 +129,25 @@ class Users(AbstractUser):
 
     @property
     def is_student_assistant_user(self):
-        return bool(self.is_student_user and self.teaching.all())
+        return self.is_student_user and bool(self.teaching_course_ids)
+
+    @property
+    def role(self):
+        if self.is_teacher_user:
+            return 'teacher'
+        if self.is_student_assistant_user:
+            return 'student_assistant'
+        if self.is_student_user:
+            return 'student'
+        return None
+
+    @cached_property
+    def teaching_course_ids(self):
+        # ids of the courses taught by the user, loaded once per user instance
+        # (request.user is loaded on every request)
+        return frozenset(
+            Courses.teachers.through.objects.filter(users_id=self.pk).values_list('courses_id', flat=True)
+        )
 
 
 class ClassTypes(models.Model):
@@ -83,6 +170,21 @@ class ClassTypes(models.Model):
             )
         return _class_type
 
+    @classmethod
+    def get_or_create_class_types(cls, class_types):
+        # returns {class_type: ClassTypes}
+        class_types = set(class_types)
+        _class_types = cls.objects.in_bulk(list(class_types), field_name='class_type')
+        new_class_types = [cls(class_type=class_type) for class_type in class_types - set(_class_types)]
+        if new_class_types:
+            cls.objects.bulk_create(new_class_types, ignore_conflicts=True)
+            _class_types.update(cls.objects.in_bulk(
+                [class_type.class_type for class_type in new_class_types], field_name='class_type'
+            ))
+            # bulk_create doesn't send the signals bumping the version
+            ResourceVersions.bump('class_types')
+        return _class_types
+
 
 class Courses(models.Model):
     # course name (eg. Programming, Artificial Intelligence)
@@ -101,10 +203,10 @@ class Courses(models.Model):
 
     @classmethod
     def get_or_cretate_course(cls, course_name, course_details="", teachers=[]):
+        # teachers: the Users teaching the course if it's created
         try:
             course = cls.objects.get(course_name=course_name)
         except cls.DoesNotExist:
-            teachers = [Users.objects.get(username=teacher) for teacher in teachers]
             course = cls.objects.create(
                 course_name=course_name,
                 course_details=course_details,
@@ -113,6 +215,28 @@ class Courses(models.Model):
             course.save()
         return course
 
+    @classmethod
+    def create_courses(cls, course_names, teacher):
+        # returns {course_name: Courses}, every new course is taught by teacher
+        course_names = list(course_names)
+        cls.objects.bulk_create([cls(course_name=course_name) for course_name in course_names])
+        courses = cls.objects.in_bulk(course_names, field_name='course_name')
+        cls.teachers.through.objects.bulk_create([
+            cls.teachers.through(courses_id=course.id, users_id=teacher.id) for course in courses.values()
+        ])
+        # bulk_create doesn't send the signals bumping the version
+        ResourceVersions.bump('courses')
+        return courses
+
+
+class AttendancesQuerySet(models.QuerySet):
+
+    def delete(self):
+        # the deletions are recorded for the delta sync
+        with transaction.atomic(using=self.db):
+            AttendanceDeletions.record(self)
+            return super().delete()
+
 
 class Attendances(models.Model):
     # the student
@@ -133,8 +257,155 @@ class Attendances(models.Model):
     # class details (eg. Last Practical Lesson, First Conference)
     details =  models.TextField(default='')
 
+    objects = AttendancesQuerySet.as_manager()
+
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+            models.Index(fields=['student', 'date'], name='attendance_student_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'course', 'class_type', 'date'],
+                name='unique_attendance'
+            ),
+        ]
 
     def __str__(self):
         return "{} - {}:{} - {}".format(self.student, self.class_type, self.course, self.date)
+
+    def delete(self, using=None, keep_parents=False):
+        with transaction.atomic(using=using):
+            AttendanceDeletions.record(Attendances.objects.using(using).filter(pk=self.pk))
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    @property
+    def unique_key(self):
+        return (self.student_id, self.course_id, self.class_type_id, self.date)
+
+
+class AttendanceDeletions(models.Model):
+    # deleted attendances, their AUTOINCREMENT ids are the sequence of the
+    # deletions for the delta sync (as the ids of Attendances are the
+    # sequence of the creations)
+
+    # the deleted attendance
+    attendance_id = models.IntegerField()
+
+    # a user that could see the attendance: its student, its teacher or a
+    # teacher of its course, each one gets its own deletion
+    viewer_id = models.IntegerField(db_index=True)
+
+    # the attendance as the clients know it
+    student_username = models.CharField(max_length=150)
+    course_name = models.CharField(max_length=255)
+    class_type = models.CharField(max_length=255)
+    date = models.DateField()
+
+    def __str__(self):
+        return "{} - {}:{} - {}".format(self.student_username, self.class_type, self.course_name, self.date)
+
+    @classmethod
+    def record(cls, attendances):
+        """
+            Records the deletion of the attendances queryset for every user
+            that could see them, it must be called before they are deleted.
+        """
+        attendances = list(attendances.values_list(
+            "id", "student_id", "teacher_id", "course_id",
+            "student__username", "course__course_name", "class_type__class_type", "date"
+        ))
+        course_teachers = {}
+        for course_id, teacher_id in Courses.teachers.through.objects.filter(
+                courses_id__in={attendance[3] for attendance in attendances}
+        ).values_list("courses_id", "users_id"):
+            course_teachers.setdefault(course_id, set()).add(teacher_id)
+
+        cls.objects.bulk_create([
+            cls(attendance_id=attendance_id, viewer_id=viewer_id, student_username=student_username,
+                course_name=course_name, class_type=class_type, date=date)
+            for (attendance_id, student_id, teacher_id, course_id, student_username, course_name, class_type, date)
+            in attendances
+            for viewer_id in sorted({student_id, teacher_id} | course_teachers.get(course_id, set()))
+        ])
+
+
+class RefreshTokens(models.Model):
+    # the user the token refreshes access tokens for
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='refresh_tokens')
+
+    # tokens rotated from the same login share a family
+    family = models.UUIDField(default=uuid.uuid4, db_index=True)
+
+    # HMAC of the token, the token itself is never stored
+    token_hash = models.CharField(max_length=64, unique=True)
+
+    expires = models.DateTimeField()
+
+    # a used token has been rotated, using it again revokes its family
+    used = models.BooleanField(default=False)
+
+    revoked = models.BooleanField(default=False)
+
+    def __str__(self):
+        return "{} - {}".format(self.user, self.family)
+
+    @staticmethod
+    def hash_token(token):
+        return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+    @classmethod
+    def create_token(cls, user, family=None, expires=None):
+        # the tokens rotated from a login expire with its first token
+        token = secrets.token_urlsafe(32)
+        cls.objects.create(
+            user=user,
+            family=family or uuid.uuid4(),
+            token_hash=cls.hash_token(token),
+            expires=expires or timezone.now() + settings.JWT_AUTH['JWT_REFRESH_EXPIRATION_DELTA']
+        )
+        return token
+
+    def rotate(self):
+        """
+            Returns a new token of the family of this (used) token. Only the
+            last used token of a family is kept, to detect its reuse.
+        """
+        RefreshTokens.objects.filter(family=self.family, used=True).exclude(pk=self.pk).delete()
+        return RefreshTokens.create_token(self.user, self.family, self.expires)
+
+    @property
+    def is_expired(self):
+        return self.expires <= timezone.now()
+
+    def revoke_family(self):
+        RefreshTokens.objects.filter(family=self.family).update(revoked=True)
+
+
+class ResourceVersions(models.Model):
+    # versioned resource (eg. class_types, courses)
+    resource = models.CharField(max_length=64, unique=True)
+
+    # bumped on every write to the resource
+    version = models.PositiveIntegerField(default=0)
+
+    # time of the last write to the resource
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return "{} - {}".format(self.resource, self.version)
+
+    @property
+    def etag(self):
+        return "{}-{}".format(self.resource, self.version)
+
+    @classmethod
+    def get_version(cls, resource):
+        return cls.objects.get_or_create(resource=resource)[0]
+
+    @classmethod
+    def bump(cls, resource):
+        now = timezone.now()
+        if not cls.objects.filter(resource=resource).update(version=models.F('version') + 1, modified=now):
+            cls.objects.get_or_create(resource=resource, defaults={'version': 1, 'modified': now})
@@ -0,0 +1,184 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import status
+
+
+class AttendancesCursorPagination(BasePagination):
+    """
+        Keyset pagination over (date, id), deep pages cost the same as the
+        first one because no OFFSET is used.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    ordering = ('date', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            last_date, last_id = position
+            queryset = queryset.filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))
+
+        # fetch one more row to know if there is a next page
+        results = list(queryset[:self.current_page_size + 1])
+        self.has_next = len(results) > self.current_page_size
+        self.page = results[:self.current_page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(last.date, last.id))
+
+    def encode_cursor(self, last_date, last_id):
+        position = '{}:{}'.format(last_date.isoformat(), last_id)
+        return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            last_date, last_id = position.split(':')
+            return date.fromisoformat(last_date), int(last_id)
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class SyncResetRequired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Full resync required'
+    default_code = 'sync_reset_required'
+
+
+class AttendancesSyncPagination(BasePagination):
+    """
+        Delta sync of the attendances. A sync token is the last attendance id
+        and the last deletion id a client has seen: both are AUTOINCREMENT
+        keys, never reused and (SQLite serializing the writes) committed in
+        order, so the changes since a token are the rows after those ids,
+        read through the primary keys. The token also carries the courses
+        the user taught, when they start or stop teaching a course (that
+        isn't deleted) the client has to sync everything again.
+    """
+
+    sync_query_param = 'since'
+    page_size = 1000
+    invalid_token_message = 'Invalid sync token'
+
+    def paginate_changes(self, attendances, deletions, request, teaching_ids, courses):
+        """
+            Returns the created attendances and the deletions after the sync
+            token of the request, at most page_size of each. Raises
+            SyncResetRequired when the user doesn't teach the courses of the
+            token anymore.
+        """
+        self.request = request
+        last_created, last_deleted, token_teaching_ids = self.decode_token(request)
+        teaching_ids = frozenset(teaching_ids)
+
+        # the attendances of the deleted courses are synced as deletions
+        if teaching_ids - token_teaching_ids or courses.filter(id__in=token_teaching_ids - teaching_ids).exists():
+            raise SyncResetRequired()
+
+        # fetch one more row to know if there are more changes
+        created = list(attendances.filter(id__gt=last_created).order_by('id')[:self.page_size + 1])
+        deleted = list(deletions.filter(id__gt=last_deleted).order_by('id')[:self.page_size + 1])
+        self.has_next = len(created) > self.page_size or len(deleted) > self.page_size
+        created, deleted = created[:self.page_size], deleted[:self.page_size]
+
+        self.sync_token = self.encode_token(
+            created[-1].id if created else last_created,
+            deleted[-1].id if deleted else last_deleted,
+            teaching_ids
+        )
+        return created, deleted
+
+    def get_paginated_response(self, data, deleted):
+        return Response({
+            'next': self.get_next_link(),
+            'sync_token': self.sync_token,
+            'deleted': deleted,
+            'results': data
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.sync_query_param, self.sync_token)
+
+    def encode_token(self, last_created, last_deleted, teaching_ids):
+        position = '{}:{}:{}'.format(last_created, last_deleted, ','.join(str(id) for id in sorted(teaching_ids)))
+        return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_token(self, request):
+        encoded = request.query_params.get(self.sync_query_param, '')
+        try:
+            position = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            last_created, last_deleted, teaching_ids = position.split(':')
+            teaching_ids = frozenset(int(id) for id in teaching_ids.split(',') if id)
+            return int(last_created), int(last_deleted), teaching_ids
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_token_message)
+
+
+class CourseStatsPagination(PageNumberPagination):
+    """
+        Page number pagination for the per student counts of a course.
+    """
+
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        }
+
+
+class CoursesPagination(PageNumberPagination):
+    """
+        Page number pagination of the courses, only used when the page_size
+        query parameter is given.
+    """
+
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
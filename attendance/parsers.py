@@ -0,0 +1,25 @@
+import codecs
+import csv
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVParser(BaseParser):
+    """
+        Parses a CSV with a header row into a list of dicts.
+    """
+
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # spreadsheet exports start with a BOM, it's not part of the header
+        if codecs.lookup(encoding).name == 'utf-8':
+            encoding = 'utf-8-sig'
+        try:
+            return list(csv.DictReader(codecs.iterdecode(stream, encoding)))
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
@@ -24,6 +24,15 @@ class IsTeacherUser(BasePermission):
         return bool(request.user and Users.is_valid_teacher_email(request.user.username))
 
 
+class IsStudentUser(BasePermission):
+    """
+        Allows access only to student users.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and Users.is_valid_student_id(request.user.username))
+
+
 class IsCourseTeacher(BasePermission):
     """
         Allows access only to teachers of a course.
@@ -31,10 +40,10 @@ class IsCourseTeacher(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if isinstance(obj, Attendances):
-            course = obj.course
+            course_id = obj.course_id
         else:
-            course = obj
-        return request.user in course.teachers.all()
+            course_id = obj.pk
+        return course_id in getattr(request.user, 'teaching_course_ids', ())
 
 
 class IsAssistanceOwner(BasePermission):
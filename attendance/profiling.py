@@ -0,0 +1,120 @@
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+
+PROFILE_FILES = {
+    'prof': '.prof',
+    'snapshot': '.snapshot',
+}
+
+PROFILE_ID_REGEX = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+
+class ProfileStore:
+    """
+        Ring of the most recent request profiles on disk: a cProfile .prof,
+        an optional tracemalloc .snapshot and a .json with the request info
+        per profile. It keeps at most max_profiles profiles taking at most
+        max_bytes, the oldest ones are deleted first.
+    """
+
+    def __init__(self, directory, max_profiles=50, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def save(self, profiler, snapshot, info):
+        """
+            Stores the profiler stats and the memory snapshot (if any) with
+            info, returns the profile id.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.utcnow()
+        profile_id = '{:%Y%m%dT%H%M%S%f}-{}'.format(now, uuid.uuid4().hex[:8])
+
+        profiler.dump_stats(self._path(profile_id, 'prof'))
+        if snapshot is not None:
+            snapshot.dump(self._path(profile_id, 'snapshot'))
+        files = {
+            kind: os.path.getsize(self._path(profile_id, kind))
+            for kind in PROFILE_FILES if os.path.exists(self._path(profile_id, kind))
+        }
+        # the info file is written last, a profile without it is incomplete
+        with open(self._path(profile_id, 'json'), 'w') as info_file:
+            json.dump(dict(info, id=profile_id, created=now.isoformat(), files=files), info_file)
+
+        self.prune()
+        return profile_id
+
+    def list(self):
+        """
+            Returns the info of every stored profile, newest first.
+        """
+        profiles = []
+        for profile_id in reversed(self._profile_ids()):
+            try:
+                with open(self._path(profile_id, 'json')) as info_file:
+                    profiles.append(json.load(info_file))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def get_path(self, profile_id, kind):
+        """
+            Returns the path of the kind file of a profile, None if there is
+            no such file.
+        """
+        if kind not in PROFILE_FILES or not PROFILE_ID_REGEX.match(profile_id):
+            return None
+        path = self._path(profile_id, kind)
+        return path if os.path.exists(path) else None
+
+    def prune(self):
+        with self._lock:
+            profile_ids = self._profile_ids()
+            sizes = {profile_id: self._size(profile_id) for profile_id in profile_ids}
+            total = sum(sizes.values())
+            while profile_ids and (len(profile_ids) > self.max_profiles or total > self.max_bytes):
+                profile_id = profile_ids.pop(0)
+                total -= sizes[profile_id]
+                for kind in list(PROFILE_FILES) + ['json']:
+                    try:
+                        os.remove(self._path(profile_id, kind))
+                    except FileNotFoundError:
+                        pass
+
+    def _profile_ids(self):
+        # ids start with their creation time, sorting them sorts the profiles
+        try:
+            file_names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            file_name[:-len('.json')] for file_name in file_names
+            if file_name.endswith('.json') and PROFILE_ID_REGEX.match(file_name[:-len('.json')])
+        )
+
+    def _size(self, profile_id):
+        size = 0
+        for kind in list(PROFILE_FILES) + ['json']:
+            try:
+                size += os.path.getsize(self._path(profile_id, kind))
+            except FileNotFoundError:
+                pass
+        return size
+
+    def _path(self, profile_id, kind):
+        return os.path.join(self.directory, profile_id + PROFILE_FILES.get(kind, '.' + kind))
+
+
+profile_store = ProfileStore(
+    settings.PROFILING['DIRECTORY'],
+    max_profiles=settings.PROFILING['MAX_PROFILES'],
+    max_bytes=settings.PROFILING['MAX_BYTES'],
+)
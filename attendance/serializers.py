@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from .models import *
+from .timing import timed
 
 
 class TokenSerializer(serializers.Serializer):
@@ -8,15 +9,27 @@ class TokenSerializer(serializers.Serializer):
         This serializer serializes the token data
     """
     token = serializers.CharField(max_length=255)
+    refresh_token = serializers.CharField(max_length=255)
 
 
-class ClassTypesSerializer(serializers.ModelSerializer):
+class TimedModelSerializer(serializers.ModelSerializer):
+    """
+        Model serializer whose representation time is counted in the
+        serializer phase of the request timing
+    """
+
+    @timed('serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+class ClassTypesSerializer(TimedModelSerializer):
     class Meta:
         model = ClassTypes
         fields = ("class_type",)
 
 
-class CoursesSerializer(serializers.ModelSerializer):
+class CoursesSerializer(TimedModelSerializer):
     teachers = serializers.SlugRelatedField(many=True, queryset=Users.objects.all(), slug_field='username')
 
     class Meta:
@@ -26,13 +39,12 @@ class CoursesSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         instance.course_name = validated_data["course_name"]
         instance.course_details = validated_data.get("course_details", "")
-        teachers = validated_data.get("teachers", [])
-        teachers = [Users.objects.get(username=teacher) for teacher in teachers]
-        instance.teachers.set(teachers)
+        # teachers: the resolved Users, as validated by the teachers field
+        instance.teachers.set(validated_data.get("teachers", []))
         return instance
 
 
-class UsersSerializer(serializers.ModelSerializer):
+class UsersSerializer(TimedModelSerializer):
     full_name = serializers.StringRelatedField(source="get_full_name")
     teaching = serializers.StringRelatedField(many=True)
 
@@ -41,7 +53,7 @@ class UsersSerializer(serializers.ModelSerializer):
         fields = ("username", "full_name", "teaching")
 
 
-class AttendancesSerializer(serializers.ModelSerializer):
+class AttendancesSerializer(TimedModelSerializer):
     student_id = serializers.StringRelatedField(source='student')
     student_name = serializers.StringRelatedField(source="student.get_full_name")
     teacher_name = serializers.StringRelatedField(source="teacher.get_full_name")
@@ -51,3 +63,65 @@ class AttendancesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendances
         fields = ("student_id", "student_name", "teacher_name", "date", "course_name", "class_type", "details")
+
+
+# Columns selected by the flat (values_list) read path, in the order
+# expected by attendance_values_to_dict
+ATTENDANCES_VALUES_FIELDS = (
+    "student__username",
+    "student__first_name",
+    "student__last_name",
+    "teacher__first_name",
+    "teacher__last_name",
+    "date",
+    "course__course_name",
+    "class_type__class_type",
+    "details",
+)
+
+
+def attendance_values_to_dict(values):
+    """
+        Builds the AttendancesSerializer representation of an attendance
+        from a row of ATTENDANCES_VALUES_FIELDS
+    """
+    (student_id, student_first_name, student_last_name, teacher_first_name,
+     teacher_last_name, date, course_name, class_type, details) = values
+    return {
+        "student_id": student_id,
+        "student_name": "{} {}".format(student_first_name, student_last_name).strip(),
+        "teacher_name": "{} {}".format(teacher_first_name, teacher_last_name).strip(),
+        "date": date.isoformat(),
+        "course_name": course_name,
+        "class_type": class_type,
+        "details": details,
+    }
+
+
+@timed('serializer')
+def attendance_values_to_dicts(rows):
+    return [attendance_values_to_dict(values) for values in rows]
+
+
+# Columns of AttendanceDeletions read by the delta sync, in the order
+# expected by attendance_deletion_values_to_dict
+ATTENDANCE_DELETIONS_VALUES_FIELDS = (
+    "student_username",
+    "course_name",
+    "class_type",
+    "date",
+)
+
+
+def attendance_deletion_values_to_dict(values):
+    """
+        Builds the natural key (student, course, class type and date) of a
+        deleted attendance from a row of ATTENDANCE_DELETIONS_VALUES_FIELDS
+    """
+    student_id, course_name, class_type, date = values
+    return {
+        "student_id": student_id,
+        "date": date.isoformat(),
+        "course_name": course_name,
+        "class_type": class_type,
+    }
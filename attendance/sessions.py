@@ -0,0 +1,143 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+from django.conf import settings
+
+
+class ClassSession:
+    """
+        A class of a course opened by a teacher for the students to check in
+        by themselves scanning its rotating QR token.
+    """
+
+    def __init__(self, session_id, teacher, course_name, class_type, date, details, expires):
+        self.id = session_id
+        self.teacher = teacher
+        self.course_name = course_name
+        self.class_type = class_type
+        self.date = date
+        self.details = details
+        self.expires = expires
+        # the tokens are signed with a key of the session
+        self.key = secrets.token_bytes(32)
+        self.checked_in = set()
+
+
+class ClassSessionTable:
+    """
+        In-memory table of the open class sessions. The check-in tokens of a
+        session are an HMAC of its id and the current rotation window, they
+        are verified against this table without reading the database. A token
+        is valid for its window and the next one, so a QR scanned right
+        before it rotates is still accepted. It's kept per process.
+    """
+
+    def __init__(self, rotation=15, max_duration=3 * 60 * 60, max_sessions=1000):
+        self.rotation = rotation
+        self.max_duration = max_duration
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def open(self, teacher, course_name, class_type, date, details="", duration=None):
+        """
+            Opens a session of duration seconds (at most max_duration),
+            returns None if there are already max_sessions open.
+        """
+        now = time.time()
+        duration = min(duration or self.max_duration, self.max_duration)
+        session = ClassSession(
+            secrets.token_urlsafe(12), teacher, course_name, class_type, date, details, now + duration
+        )
+        with self._lock:
+            self._prune(now)
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None or session.expires <= time.time():
+            return None
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def get_token(self, session):
+        """
+            Returns the current token of the session and the seconds until it
+            rotates.
+        """
+        window, remaining = divmod(time.time(), self.rotation)
+        return self._sign(session, int(window)), self.rotation - remaining
+
+    def verify(self, token):
+        """
+            Returns the session of the token, None if it's invalid or expired.
+        """
+        try:
+            session_id, window, _ = token.split(".")
+            window = int(window)
+        except (AttributeError, ValueError):
+            return None
+        session = self.get(session_id)
+        if session is None or int(time.time() // self.rotation) - window not in (0, 1):
+            return None
+        if not hmac.compare_digest(token.encode(), self._sign(session, window).encode()):
+            return None
+        return session
+
+    def check_in(self, session, student_id):
+        """
+            Marks the student as checked in, returns False if they already were.
+        """
+        with self._lock:
+            if student_id in session.checked_in:
+                return False
+            session.checked_in.add(student_id)
+            return True
+
+    def check_out(self, session, student_id):
+        with self._lock:
+            session.checked_in.discard(student_id)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def _sign(self, session, window):
+        message = "{}.{}".format(session.id, window)
+        signature = hmac.new(session.key, message.encode("ascii"), hashlib.sha256).hexdigest()[:32]
+        return "{}.{}".format(message, signature)
+
+    def _prune(self, now):
+        for session_id, session in list(self._sessions.items()):
+            if session.expires <= now:
+                del self._sessions[session_id]
+
+
+def get_class_session_data(session):
+    token, token_expires_in = class_sessions.get_token(session)
+    return {
+        "session": session.id,
+        "course_name": session.course_name,
+        "class_type": session.class_type,
+        "date": session.date.isoformat(),
+        "expires_in": round(session.expires - time.time()),
+        "token": token,
+        "token_expires_in": round(token_expires_in, 3),
+        "checked_in": len(session.checked_in),
+    }
+
+
+class_sessions = ClassSessionTable(
+    rotation=settings.CLASS_SESSIONS["TOKEN_ROTATION"],
+    max_duration=settings.CLASS_SESSIONS["MAX_DURATION"],
+    max_sessions=settings.CLASS_SESSIONS["MAX_SESSIONS"],
+)
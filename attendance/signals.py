@@ -0,0 +1,97 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import revoked_tokens
+from .cache import class_types_cache, courses_cache
+from .models import AttendanceDeletions, Attendances, ClassTypes, Courses, RefreshTokens, ResourceVersions, Users
+
+
+@receiver(post_save, sender=Courses)
+@receiver(post_delete, sender=Courses)
+def invalidate_cached_course(sender, instance, **kwargs):
+    courses_cache.invalidate(instance)
+
+
+@receiver(post_save, sender=ClassTypes)
+@receiver(post_delete, sender=ClassTypes)
+def invalidate_cached_class_type(sender, instance, **kwargs):
+    class_types_cache.invalidate(instance)
+
+
+@receiver(post_save, sender=ClassTypes)
+@receiver(post_delete, sender=ClassTypes)
+def bump_class_types_version(sender, **kwargs):
+    ResourceVersions.bump('class_types')
+
+
+@receiver(post_save, sender=Courses)
+@receiver(post_delete, sender=Courses)
+def bump_courses_version(sender, **kwargs):
+    ResourceVersions.bump('courses')
+
+
+@receiver(m2m_changed, sender=Courses.teachers.through)
+def bump_courses_teachers_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        ResourceVersions.bump('courses')
+
+
+@receiver(m2m_changed, sender=Courses.teachers.through)
+def revoke_teachers_tokens(sender, instance, action, reverse, pk_set, **kwargs):
+    # the taught courses embedded in the tokens of these users are stale
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            revoked_tokens.revoke(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set:
+            revoked_tokens.revoke(user_id)
+    elif action == 'pre_clear':
+        for user_id in instance.teachers.values_list('id', flat=True):
+            revoked_tokens.revoke(user_id)
+
+
+@receiver(post_save, sender=Users)
+def revoke_saved_user_tokens(sender, instance, created, update_fields, **kwargs):
+    # logging in only updates last_login, which isn't embedded in the tokens
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    revoked_tokens.revoke(instance.pk)
+
+
+@receiver(post_delete, sender=Users)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoked_tokens.revoke(instance.pk)
+
+
+@receiver(post_save, sender=Users)
+def revoke_user_refresh_tokens(sender, instance, created, **kwargs):
+    # a new password (set_password keeps it in _password until saved) or a
+    # deactivated user ends every login of the user
+    if created:
+        return
+    if instance._password is not None or not instance.is_active:
+        RefreshTokens.objects.filter(user=instance, revoked=False).update(revoked=True)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def bump_teachers_courses_version(sender, instance, update_fields=None, created=False, **kwargs):
+    # the courses embed their teachers usernames, deleting a user removes it
+    # from its courses without m2m_changed
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    ResourceVersions.bump('courses')
+
+
+# the cascades of their course and student delete the attendances in a
+# single query, bypassing Attendances.delete and AttendancesQuerySet.delete
+# (which record every other deletion). Adding a receiver on Attendances would
+# make the cascades load and signal them one by one
+@receiver(pre_delete, sender=Courses)
+def record_deleted_course_attendances(sender, instance, **kwargs):
+    AttendanceDeletions.record(Attendances.objects.filter(course=instance))
+
+
+@receiver(pre_delete, sender=Users)
+def record_deleted_student_attendances(sender, instance, **kwargs):
+    AttendanceDeletions.record(Attendances.objects.filter(student=instance))
@@ -1,14 +1,32 @@
+import csv
 import datetime
+import io
 import json
+import os
+import pstats
+import queue
 import random
+import tempfile
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient, APITestCase
 from rest_framework.views import status
+from rest_framework_jwt.settings import api_settings
 
+from .authentication import revoked_tokens
+from .cache import class_types_cache, courses_cache
+from .ingest import ScanIngestQueue, error_result, ingest_queue
 from .models import *
+from .pagination import *
+from .profiling import profile_store
 from .serializers import *
+from .sessions import class_sessions
 
 # tests for views
 
@@ -17,6 +35,11 @@ class BaseViewTest(APITestCase):
     client = APIClient()
 
     def setUp(self):
+        # test transactions are rolled back without signals, so the
+        # reference data cached by a test can't be reused by the next one
+        courses_cache.clear()
+        class_types_cache.clear()
+
         # create a teacher user
         self.teacher = BaseViewTest.create_teacher(
             teacher_email="jonny@matcom.uh.cu",
@@ -188,6 +211,41 @@ class ClassTypesViewTest(BaseViewTest):
         self.assertEqual(response.data, serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_all_class_types_not_modified(self):
+        """
+            This test ensures that the class_types/ endpoint sends an ETag and
+            a Last-Modified header, and that a GET request with a matching
+            If-None-Match header gets a 304 with a single query
+        """
+
+        url = reverse("class_types-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+
+    def test_get_all_class_types_etag_changes(self):
+        """
+            This test ensures that the ETag of the class_types/ endpoint
+            changes when a class type is created
+        """
+
+        url = reverse("class_types-list-create", kwargs={"version": "v1"})
+        etag = self.client.get(url)["ETag"]
+
+        self.login_client(self.teacher.username, 'testing')
+        response = self.make_request("class_types-list-create", kind="post", data={"class_type": "Partial Exam"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
     def test_get_a_class_type_that_does_not_exist(self):
         """
             This test try to get a class type that doesn't exists and make assertions
@@ -304,6 +362,23 @@ class ClassTypesViewTest(BaseViewTest):
         self.assertEqual(response.data, {"class_type": new_class_type})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_update_a_class_type_invalidates_cache(self):
+        """
+            This test ensures that an updated class type isn't served from
+            the class types cache
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        class_type = random.choice(ClassTypesViewTest.CLASS_TYPES)
+        cached = class_types_cache.get(class_type)
+        self.make_request("class_types-detail", kind="put",
+            data={"class_type": "New class type"},
+            type=class_type
+        )
+        self.assertRaises(ClassTypes.DoesNotExist, class_types_cache.get, class_type)
+        self.assertEqual(class_types_cache.get("New class type").pk, cached.pk)
+
     def test_delete_a_class_type_no_logged_user(self):
         """
             This test ensures that to delete a class_type the user need to be logged
@@ -471,6 +546,83 @@ class CoursesViewTest(BaseViewTest):
         self.assertEqual(response.data, serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_all_courses_number_of_queries(self):
+        """
+            This test ensures that the number of queries needed to get all
+            courses doesn't grow with the number of courses and teachers
+        """
+
+        url = reverse("courses-list-create", kwargs={"version": "v1"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        number_of_queries = len(queries)
+
+        for index in range(10):
+            self.create_course("Course {}".format(index), teachers=[self.teacher, self.student_assistant])
+
+        with self.assertNumQueries(number_of_queries):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), Courses.objects.count())
+
+    def test_get_all_courses_paginated(self):
+        """
+            This test ensures that the courses are paginated when a page size
+            is given
+        """
+
+        url = reverse("courses-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url, data={"page_size": 3})
+        self.assertEqual(response.data["count"], 4)
+        results = response.data["results"]
+        self.assertEqual(len(results), 3)
+
+        response = self.client.get(response.data["next"])
+        results += response.data["results"]
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(results, CoursesSerializer(Courses.objects.all(), many=True).data)
+
+    def test_search_courses(self):
+        """
+            This test ensures that the courses can be searched by a prefix of
+            their name
+        """
+
+        url = reverse("courses-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url, data={"search": "Comp"})
+        self.assertEqual(
+            [course["course_name"] for course in response.data],
+            ["Computer Architecture", "Computer Vision"]
+        )
+
+        response = self.client.get(url, data={"search": "Vision"})
+        self.assertEqual(response.data, [])
+
+    def test_get_all_courses_etag_changes(self):
+        """
+            This test ensures that a GET request to the courses/ endpoint with
+            the current ETag gets a 304, and that the ETag changes when a
+            course is updated
+        """
+
+        url = reverse("courses-list-create", kwargs={"version": "v1"})
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.login_client(self.teacher.username, 'testing')
+        course_name = random.choice(CoursesViewTest.COURSE_NAMES)
+        self.teacher.teaching.add(Courses.objects.get(course_name=course_name))
+        response = self.make_request("courses-detail", kind="put",
+            data={"course_name": course_name, "course_details": "New course detail", "teachers": []},
+            name=course_name
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
     def test_get_a_course_that_does_not_exist(self):
         """
             This test try to get a course that doesn't exists and make assertions
@@ -560,6 +712,23 @@ class CoursesViewTest(BaseViewTest):
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_update_a_course_no_course_teacher_number_of_queries(self):
+        """
+            This test ensures that denying a course update to a teacher of
+            other courses doesn't load the course teachers
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        course_name = random.choice(CoursesViewTest.COURSE_NAMES)
+        # the user and the courses taught by the user come from the token
+        with self.assertNumQueries(1):
+            response = self.make_request("courses-detail", kind="put",
+                data={"course_name": course_name},
+                name=course_name
+            )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_update_a_course_that_does_not_exist(self):
         """
             This test try to update a course that doesn't exists and make assertions
@@ -803,6 +972,54 @@ class CoursesViewTest(BaseViewTest):
         self.assertEqual(response.data, course_data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_a_course_number_of_queries(self):
+        """
+            This test ensures that the number of queries needed to create a
+            course doesn't grow with the number of teachers
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        teachers = [
+            self.create_teacher("teacher{}@matcom.uh.cu".format(index), "Teacher", str(index)).username
+            for index in range(10)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.make_request("courses-list-create", kind="post", data={
+                "course_name": "Operating System",
+                "teachers": teachers[:1]
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        number_of_queries = len(queries)
+
+        # the token claims of the teacher of the new course are stale
+        self.login_client(self.teacher.username, 'testing')
+        with self.assertNumQueries(number_of_queries):
+            response = self.make_request("courses-list-create", kind="post", data={
+                "course_name": "Compilers",
+                "teachers": teachers
+            })
+        self.assertEqual(len(response.data["teachers"]), 11)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_a_course_with_missing_teachers(self):
+        """
+            This test ensures that every teacher that doesn't exist is
+            reported at once
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        response = self.make_request("courses-list-create", kind="post", data={
+            "course_name": "Operating System",
+            "teachers": ["missing1@matcom.uh.cu", self.student.username, "missing2@matcom.uh.cu"]
+        })
+        self.assertEqual(
+            response.data["message"],
+            "users with usernames: missing1@matcom.uh.cu, missing2@matcom.uh.cu don't exist"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class AttendancesViewTest(BaseViewTest):
     """
@@ -879,7 +1096,7 @@ class AttendancesViewTest(BaseViewTest):
         # fetch the data from db
         expected = Attendances.objects.filter(student=self.student)
         serialized = AttendancesSerializer(expected, many=True)
-        self.assertEqual(response.data, serialized.data)
+        self.assertEqual(response.data['results'], serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_get_all_attendances_by_a_student_assistant(self):
@@ -904,7 +1121,7 @@ class AttendancesViewTest(BaseViewTest):
 
         expected = teacher_attendances | student_attendances
         serialized = AttendancesSerializer(expected, many=True)
-        self.assertEqual(response.data, serialized.data)
+        self.assertEqual(response.data['results'], serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_get_all_attendances_by_a_teacher(self):
@@ -920,8 +1137,349 @@ class AttendancesViewTest(BaseViewTest):
         # fetch the data from db
         expected = Attendances.objects.filter(teacher=self.teacher)
         serialized = AttendancesSerializer(expected, many=True)
-        self.assertEqual(response.data, serialized.data)
+        self.assertEqual(response.data['results'], serialized.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_attendances_number_of_queries(self):
+        """
+            This test ensures that the number of queries needed to get all
+            attendances doesn't grow with the number of attendances
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.make_request("attendances-list-create")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # add more attendances to every course
+        for attendance in list(Attendances.objects.all()):
+            for days in range(1, 6):
+                self.create_attendance(attendance.student, attendance.teacher,
+                                       attendance.date - datetime.timedelta(weeks=days),
+                                       attendance.course, attendance.class_type)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.make_request("attendances-list-create")
+        # the student assistant can see every attendance of the test data
+        self.assertEqual(len(response.data['results']), Attendances.objects.count())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_attendances_paginated(self):
+        """
+            This test ensures that following the next links returns every
+            attendance once, ordered by date and id
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        # add attendances sharing the same date
+        seminar = self.create_class_type("Seminar")
+        for attendance in list(Attendances.objects.all()):
+            self.create_attendance(attendance.student, attendance.teacher, attendance.date,
+                                   attendance.course, seminar)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"}) + "?page_size=3"
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            results.extend(response.data['results'])
+            url = response.data['next']
+
+        expected = Attendances.objects.order_by('date', 'id')
+        serialized = AttendancesSerializer(expected, many=True)
+        self.assertEqual(results, serialized.data)
+
+    def test_get_all_attendances_page_size_limit(self):
+        """
+            This test ensures that the page size can't exceed the maximum page size
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"}) + "?page_size=1000"
+        with mock.patch.object(AttendancesCursorPagination, "max_page_size", 2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_attendances_invalid_cursor(self):
+        """
+            This test ensures that an invalid cursor is rejected
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"}) + "?cursor=invalid"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_all_attendances_filtered(self):
+        """
+            This test ensures that the attendances can be filtered by course,
+            class type, student, teacher and date range
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        today = datetime.date.today().isoformat()
+        response = self.client.get(url, data={
+            "course_name": "Programming",
+            "class_type": "Final Test",
+            "date_from": today,
+            "date_to": today
+        })
+        expected = Attendances.objects.filter(course__course_name="Programming", date=today)
+        self.assertEqual(response.data['results'], AttendancesSerializer(expected, many=True).data)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url, data={"teacher": self.teacher.username})
+        expected = Attendances.objects.filter(teacher=self.teacher).order_by("date", "id")
+        self.assertEqual(response.data['results'], AttendancesSerializer(expected, many=True).data)
+
+        response = self.client.get(url, data={"student_id": self.student.username})
+        expected = Attendances.objects.filter(student=self.student).order_by("date", "id")
+        self.assertEqual(response.data['results'], AttendancesSerializer(expected, many=True).data)
+
+        response = self.client.get(url, data={"course_name": "Invalid course"})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_attendances_invalid_filters(self):
+        """
+            This test ensures that the attendances filters are validated
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url, data={"date_from": "2020-02-10", "date_to": "2020-02-03"})
+        self.assertEqual(response.data["message"], "date_from must not be after date_to")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(url, data={"student_id": "not a student id"})
+        self.assertEqual(response.data["message"], "student_id is invalid")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_attendances(self):
+        """
+            This test ensures that syncing with the token of the first page
+            returns nothing until attendances are created or deleted, and then
+            only those changes
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        sync_token = self.client.get(url).data["sync_token"]
+
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(response.data["deleted"], [])
+        self.assertEqual(response.data["sync_token"], sync_token)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # a new attendance of a course taught by the student assistant
+        course = Courses.objects.get(course_name="Programming")
+        attendance = Attendances.objects.filter(course=course)[0]
+        created = self.create_attendance(self.student_assistant, self.student_assistant,
+                                         attendance.date - datetime.timedelta(weeks=1),
+                                         course, attendance.class_type)
+        deleted = Attendances.objects.get(course__course_name="Computer Architecture")
+        deleted.course.delete()
+
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.data["results"], [AttendancesSerializer(created).data])
+        self.assertEqual(response.data["deleted"], [{
+            "student_id": deleted.student.username,
+            "date": deleted.date.isoformat(),
+            "course_name": "Computer Architecture",
+            "class_type": deleted.class_type.class_type,
+        }])
+        self.assertNotEqual(response.data["sync_token"], sync_token)
+
+        response = self.client.get(url, data={"since": response.data["sync_token"]})
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_sync_attendances_deleted_course_co_teacher(self):
+        """
+            This test ensures that every teacher of a deleted course gets the
+            deletion of its attendances, even the ones that didn't scan them
+        """
+
+        course = Courses.objects.get(course_name="Computer Architecture")
+        course.teachers.add(self.teacher)
+        self.login_client(self.teacher.username, 'testing')
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        sync_token = self.client.get(url).data["sync_token"]
+
+        deleted = Attendances.objects.get(course=course)
+        self.assertNotEqual(deleted.teacher, self.teacher)
+        course.delete()
+
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.data["deleted"], [{
+            "student_id": deleted.student.username,
+            "date": deleted.date.isoformat(),
+            "course_name": "Computer Architecture",
+            "class_type": deleted.class_type.class_type,
+        }])
+
+    def test_sync_attendances_deleted(self):
+        """
+            This test ensures that the attendances deleted one by one or as a
+            queryset (as the admin does) are synced as deletions
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        sync_token = self.client.get(url).data["sync_token"]
+
+        attendances = list(Attendances.objects.filter(course__teachers=self.student_assistant).order_by("id"))
+        self.assertEqual(len(attendances), 2)
+        attendances[0].delete()
+        Attendances.objects.filter(id=attendances[1].id).delete()
+
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.data["deleted"], [{
+            "student_id": attendance.student.username,
+            "date": attendance.date.isoformat(),
+            "course_name": attendance.course.course_name,
+            "class_type": attendance.class_type.class_type,
+        } for attendance in attendances])
+
+    def test_sync_attendances_teaching_changed(self):
+        """
+            This test ensures that a user that starts or stops teaching a
+            course must sync everything again
+        """
+
+        course = Courses.objects.get(course_name="Computer Architecture")
+        self.login_client(self.teacher.username, 'testing')
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        sync_token = self.client.get(url).data["sync_token"]
+
+        course.teachers.add(self.teacher)
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+        response = self.client.get(url)
+        self.assertEqual(
+            len([result for result in response.data["results"] if result["course_name"] == course.course_name]),
+            Attendances.objects.filter(course=course).count()
+        )
+        sync_token = response.data["sync_token"]
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        course.teachers.remove(self.teacher)
+        response = self.client.get(url, data={"since": sync_token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_sync_attendances_paginated(self):
+        """
+            This test ensures that following the next links of a sync returns
+            every change once
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        with mock.patch.object(AttendancesSyncPagination, "page_size", 1):
+            response = self.client.get(url, data={"since": AttendancesSyncPagination().encode_token(
+                0, 0, self.student_assistant.teaching.values_list("id", flat=True)
+            )})
+            results = response.data["results"]
+            while response.data["next"]:
+                response = self.client.get(response.data["next"])
+                results += response.data["results"]
+        expected = Attendances.objects.order_by("id")
+        self.assertEqual(results, AttendancesSerializer(expected, many=True).data)
+
+    def test_sync_attendances_invalid_token(self):
+        """
+            This test ensures that an invalid sync token is rejected
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        url = reverse("attendances-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url, data={"since": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def export_attendances(self, **query_params):
+        url = reverse("attendances-export", kwargs={"version": "v1"})
+        return self.client.get(url, data=query_params)
+
+    def test_export_attendances_no_logged_user(self):
+        """
+            This test ensures that to export attendances the user need to be logged
+        """
+
+        response = self.export_attendances(format="csv")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_attendances_csv(self):
+        """
+            This test ensures that the csv export streams every attendance the
+            user can see
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        response = self.export_attendances(format="csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+
+        content = b"".join(response.streaming_content).decode("utf-8")
+        rows = list(csv.DictReader(io.StringIO(content)))
+        expected = Attendances.objects.order_by("date", "id")
+        serialized = AttendancesSerializer(expected, many=True)
+        self.assertEqual(rows, [dict(attendance) for attendance in serialized.data])
+
+    def test_export_attendances_ndjson_filtered(self):
+        """
+            This test ensures that the ndjson export can be filtered by course
+            and date range
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        course = self.student_assistant.teaching.all()[0]
+        attendance = Attendances.objects.get(course=course)
+        response = self.export_attendances(
+            format="ndjson",
+            course_name=course.course_name,
+            date_from=attendance.date.isoformat(),
+            date_to=attendance.date.isoformat()
+        )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [AttendancesSerializer(attendance).data])
+
+    def test_export_attendances_with_invalid_date(self):
+        """
+            This test ensures that attendances can't be exported with an invalid date range
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        response = self.export_attendances(format="ndjson", date_from="yesterday")
+        self.assertEqual(response.data["message"], "date_from must be an ISO formatted date")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_get_an_attendance_no_logged_user(self):
         """
@@ -992,6 +1550,37 @@ class AttendancesViewTest(BaseViewTest):
         self.assertEqual(response.data, serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_an_attendance_number_of_queries(self):
+        """
+            This test ensures that checking if the user teaches the attendance
+            course doesn't load the course teachers
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        attendance = Attendances.objects.filter(course__in=self.student_assistant.teaching.all()).first()
+        # the user and the courses taught by the user come from the token
+        with self.assertNumQueries(1):
+            response = self.make_request("attendances-detail", id=attendance.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_an_attendance_revoked_token(self):
+        """
+            This test ensures that once a teacher is removed from a course
+            the courses embedded in his/her token aren't trusted
+        """
+
+        self.login_client(username=self.student_assistant.username, password=self.student_assistant.username)
+
+        course = self.student_assistant.teaching.first()
+        attendance = Attendances.objects.filter(course=course).first()
+        response = self.make_request("attendances-detail", id=attendance.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        course.teachers.remove(self.student_assistant)
+        response = self.make_request("attendances-detail", id=attendance.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_create_an_attendance_no_logged_user(self):
         """
             This test ensures that to create an attendance the user need to be logged
@@ -1126,23 +1715,608 @@ class AttendancesViewTest(BaseViewTest):
         self.assertEqual(response.data, attendance)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_an_attendance_reference_data_cached(self):
+        """
+            This test ensures that once cached, scans don't query the
+            courses and class types
+        """
 
-class AuthLoginUserTest(BaseViewTest):
-    """
-        Tests for the auth/login/ endpoint
-    """
+        self.login_client(self.teacher.username, 'testing')
 
-    def test_login_user_with_invalid_credentials(self):
+        attendance = self.create_attendance_data()
+        attendance['course_name'] = random.choice(self.teacher.teaching.all()).course_name
+        response = self.make_request("attendances-list-create", kind="post", data=attendance)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attendance['student_id'] = BaseViewTest.get_random_student_ids(1)[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.make_request("attendances-list-create", kind="post", data=attendance)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        for query in queries:
+            self.assertNotIn('FROM "attendance_courses" ', query['sql'])
+            self.assertNotIn('FROM "attendance_classtypes" ', query['sql'])
+        self.assertEqual(courses_cache.stats()['hits'], 1)
+        self.assertEqual(class_types_cache.stats()['hits'], 1)
+
+    def test_create_an_attendance_that_already_exists(self):
         """
-            Test login user with invalid credentials
+            This test ensures that scanning an already recorded attendance
+            doesn't add a new attendance
         """
 
-        user_data = {
-            "username": "anonymous",
-            "password": "pass"
+        self.login_client(self.teacher.username, 'testing')
+
+        attendance = Attendances.objects.filter(teacher=self.teacher).first()
+        attendance_data = {
+            "student_id": attendance.student.username,
+            "student_name": [attendance.student.first_name, attendance.student.last_name],
+            "course_name": attendance.course.course_name,
+            "class_type": attendance.class_type.class_type,
+            "date": attendance.date.isoformat(),
+            "details": "Scanned again"
         }
-        response = self.make_request("auth-login", kind="post", data=user_data)
-        # assert status code is 401 UNAUTHORIZED
+
+        # hit the API endpoint
+        response = self.make_request("attendances-list-create", kind="post", data=attendance_data)
+        self.assertEqual(response.data, AttendancesSerializer(attendance).data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Attendances.objects.count(), 4)
+
+    def create_batch_attendance_data(self, k):
+        course_name = self.teacher.teaching.first().course_name
+        attendances = []
+        for student_id in BaseViewTest.get_random_student_ids(k):
+            attendance = self.create_attendance_data(create_objects=False)
+            attendance['student_id'] = student_id
+            attendance['course_name'] = course_name
+            attendances.append(attendance)
+        return attendances
+
+    def test_create_attendances_batch_with_new_course_then_scan(self):
+        """
+            This test ensures that a teacher can keep scanning attendances of a
+            course created by a batch with the same token
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        batch_attendance, attendance = self.create_batch_attendance_data(2)
+        batch_attendance['course_name'] = attendance['course_name'] = "Operating System"
+
+        response = self.make_request("attendances-batch-create", kind="post", data=[batch_attendance])
+        self.assertEqual(response.data[0]['status'], status.HTTP_201_CREATED)
+
+        response = self.make_request("attendances-list-create", kind="post", data=attendance)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_attendances_batch_no_logged_user(self):
+        """
+            This test ensures that to create attendances in batch the user need to be logged
+        """
+
+        attendances = self.create_batch_attendance_data(2)
+
+        # hit the API endpoint
+        response = self.make_request("attendances-batch-create", kind="post", data=attendances)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_create_attendances_batch_with_invalid_data(self):
+        """
+            This test ensures that attendances can't be added in batch if the
+            request data isn't a list
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        # test with invalid data
+        response = self.make_request("attendances-batch-create", kind="post", data={})
+        self.assertEqual(
+            response.data["message"],
+            "a list of attendances is required to add attendances"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_attendances_batch(self):
+        """
+            This test ensures that attendances can be added in batch and that
+            every scan gets its own result
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        valid, other_course, new_course, invalid = self.create_batch_attendance_data(4)
+        other_course['course_name'] = self.student_assistant.teaching.all()[0].course_name
+        invalid['student_id'] = "invalid"
+        new_course['course_name'] = "Operating System"
+        # items of the wrong types only fail themselves
+        numeric_student_id, list_course_name, numeric_details, string_student_name = [
+            dict(valid, student_id=12345678901),
+            dict(valid, course_name=[valid['course_name']]),
+            dict(valid, details=1),
+            dict(valid, student_name="Matcom Student"),
+        ]
+        attendances = [
+            valid, other_course, new_course, invalid,
+            numeric_student_id, list_course_name, numeric_details, string_student_name
+        ]
+
+        # hit the API endpoint
+        response = self.make_request("attendances-batch-create", kind="post", data=attendances)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statuses = [result['status'] for result in response.data]
+        self.assertEqual(statuses, [
+            status.HTTP_201_CREATED,
+            status.HTTP_403_FORBIDDEN,
+            status.HTTP_201_CREATED,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST
+        ])
+        self.assertEqual(response.data[3]['message'], "student_id is invalid")
+        for result in response.data[4:7]:
+            self.assertEqual(result['message'], "student_id, course_name, class_type, date and details must be strings")
+        self.assertEqual(response.data[7]['message'], "student_name must be a list of a first name and a last name")
+        for attendance, result in [(valid, response.data[0]), (new_course, response.data[2])]:
+            attendance.update({'teacher_name': self.teacher.get_full_name()})
+            attendance['student_name'] = " ".join(attendance['student_name'])
+            self.assertEqual(result['data'], attendance)
+        self.assertIn(self.teacher, Courses.objects.get(course_name="Operating System").teachers.all())
+        self.assertEqual(Attendances.objects.count(), 6)
+
+    def test_create_attendances_batch_with_duplicates(self):
+        """
+            This test ensures that scans of already recorded attendances, and
+            repeated scans of a batch, are no-ops when attendances are added
+            in batch
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        attendances = self.create_batch_attendance_data(1)
+        attendances.append(dict(attendances[0]))
+
+        # hit the API endpoint twice
+        response = self.make_request("attendances-batch-create", kind="post", data=attendances)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [status.HTTP_201_CREATED, status.HTTP_200_OK]
+        )
+        self.assertEqual(response.data[0]['data'], response.data[1]['data'])
+        response = self.make_request("attendances-batch-create", kind="post", data=attendances)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [status.HTTP_200_OK, status.HTTP_200_OK]
+        )
+        self.assertEqual(Attendances.objects.count(), 5)
+
+    @override_settings(ATTENDANCE_INGEST=dict(settings.ATTENDANCE_INGEST, ENABLED=True))
+    def test_create_an_attendance_queued(self):
+        """
+            This test ensures that in asynchronous ingest mode a scan is
+            queued, answered with a receipt and recorded when the queue is flushed
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        attendance = self.create_attendance_data()
+        attendance['course_name'] = self.teacher.teaching.first().course_name
+
+        with mock.patch.object(ScanIngestQueue, "start"):
+            response = self.make_request("attendances-list-create", kind="post", data=attendance)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        receipt = response.data["receipt"]
+        self.assertEqual(Attendances.objects.count(), 4)
+
+        response = self.make_request("attendances-receipts-detail", receipt=receipt)
+        self.assertEqual(response.data, {"receipt": receipt, "status": status.HTTP_202_ACCEPTED})
+
+        ingest_queue.flush()
+        self.assertEqual(Attendances.objects.count(), 5)
+
+        response = self.make_request("attendances-receipts-detail", receipt=receipt)
+        self.assertEqual(response.data["status"], status.HTTP_201_CREATED)
+        self.assertEqual(response.data["data"]["student_id"], attendance["student_id"])
+
+    @override_settings(ATTENDANCE_INGEST=dict(settings.ATTENDANCE_INGEST, ENABLED=True))
+    def test_create_an_attendance_queue_full(self):
+        """
+            This test ensures that scans are rejected while the ingest queue is full
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        attendance = self.create_attendance_data()
+        attendance['course_name'] = self.teacher.teaching.first().course_name
+
+        with mock.patch.object(ScanIngestQueue, "start"), \
+                mock.patch.object(ScanIngestQueue, "put", side_effect=queue.Full):
+            response = self.make_request("attendances-list-create", kind="post", data=attendance)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_ingest_queue_journal(self):
+        """
+            This test ensures that the scans queued when the ingest queue stops
+            are journaled and queued again when it starts
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "journal.jsonl")
+            attendance = self.create_attendance_data()
+            attendance['course_name'] = self.teacher.teaching.first().course_name
+            ingest = ScanIngestQueue(journal_path=journal_path)
+            receipt = ingest.put(self.teacher, attendance)
+            ingest.stop()
+            self.assertEqual(ingest.qsize(), 0)
+
+            ingest = ScanIngestQueue(journal_path=journal_path)
+            with mock.patch("threading.Thread"):
+                ingest.start()
+            self.assertEqual(ingest.qsize(), 1)
+            self.assertFalse(os.path.exists(journal_path))
+
+            ingest.flush()
+            self.assertEqual(ingest.get_receipt(receipt, self.teacher)["status"], status.HTTP_201_CREATED)
+
+    def test_create_attendances_batch_number_of_queries(self):
+        """
+            This test ensures that the number of queries needed to add
+            attendances in batch doesn't grow with the batch size
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+        self.create_class_type("Partial Exam")
+
+        # the first batch warms up the courses and class types caches
+        query_counts = []
+        for k in [1, 2, 20]:
+            attendances = self.create_batch_attendance_data(k)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.make_request("attendances-batch-create", kind="post", data=attendances)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[1], query_counts[2])
+
+
+class ClassSessionsViewTest(BaseViewTest):
+    """
+        Tests for the sessions/ endpoints
+    """
+
+    def setUp(self):
+        super(ClassSessionsViewTest, self).setUp()
+        class_sessions.clear()
+
+        # add test data
+        self.course = self.create_course("Programming", teachers=[self.teacher])
+        self.create_class_type("Conference")
+
+    def open_session(self):
+        self.login_client(self.teacher.username, 'testing')
+        response = self.make_request("sessions-create", kind="post", data={
+            "course_name": "Programming",
+            "class_type": "Conference"
+        })
+        self.client.logout()
+        self.client.credentials()
+        return response
+
+    def test_open_a_class_session_no_authorized_user(self):
+        """
+            This test ensures that only the teachers of a course can open a
+            class session of it
+        """
+
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        response = self.make_request("sessions-create", kind="post", data={
+            "course_name": "Programming",
+            "class_type": "Conference"
+        })
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_open_a_class_session(self):
+        """
+            This test ensures that a teacher can open a class session and get
+            its current token
+        """
+
+        response = self.open_session()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["course_name"], "Programming")
+        self.assertEqual(response.data["date"], datetime.date.today().isoformat())
+        session = response.data["session"]
+
+        self.login_client(self.teacher.username, 'testing')
+        response = self.make_request("sessions-detail", session=session)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(class_sessions.verify(response.data["token"]))
+
+        response = self.make_request("sessions-detail", kind="delete", session=session)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.make_request("sessions-detail", session=session)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_check_in_a_class_session(self):
+        """
+            This test ensures that a student checks in with the token of a
+            session without database queries, once, and that the check-in is
+            recorded as an attendance when the ingest queue is flushed
+        """
+
+        token = self.open_session().data["token"]
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        url = reverse("sessions-check-in", kwargs={"version": "v1"})
+        with mock.patch.object(ScanIngestQueue, "start"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, data={"token": token}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(len(queries), 0)
+
+            response = self.client.post(url, data={"token": token}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["message"], "already checked in")
+
+        ingest_queue.flush()
+        attendance = Attendances.objects.get()
+        self.assertEqual(attendance.student, self.student)
+        self.assertEqual(attendance.teacher, self.teacher)
+        self.assertEqual(attendance.course, self.course)
+        self.assertEqual(attendance.date, datetime.date.today())
+
+    def test_open_a_class_session_with_invalid_fields(self):
+        """
+            This test ensures that the course name, class type and details of
+            a class session must be strings
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        for data in [
+            {"course_name": ["Programming"], "class_type": "Conference"},
+            {"course_name": "Programming", "class_type": ["Conference"]},
+            {"course_name": "Programming", "class_type": "Conference", "details": 1},
+        ]:
+            response = self.make_request("sessions-create", kind="post", data=data)
+            self.assertEqual(response.data["message"], "course_name, class_type and details must be strings")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_check_in_a_class_session_not_recorded(self):
+        """
+            This test ensures that a student can check in again when their
+            check-in couldn't be recorded
+        """
+
+        token = self.open_session().data["token"]
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        url = reverse("sessions-check-in", kwargs={"version": "v1"})
+        with mock.patch.object(ScanIngestQueue, "start"):
+            response = self.client.post(url, data={"token": token}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+            with mock.patch("attendance.ingest.record_attendance_scans", return_value=[
+                error_result(status.HTTP_400_BAD_REQUEST, "attendance could not be recorded")
+            ]):
+                ingest_queue.flush()
+            self.assertFalse(Attendances.objects.exists())
+
+            response = self.client.post(url, data={"token": token}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        ingest_queue.flush()
+        self.assertEqual(Attendances.objects.get().student, self.student)
+
+    def test_check_in_a_class_session_with_invalid_token(self):
+        """
+            This test ensures that a forged or stale token is rejected
+        """
+
+        token = self.open_session().data["token"]
+        session_id, window, signature = token.split(".")
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        url = reverse("sessions-check-in", kwargs={"version": "v1"})
+        for invalid_token in [
+            "invalid",
+            "{}.{}.{}".format(session_id, window, "0" * len(signature)),
+            "{}.{}.{}".format(session_id, int(window) - 2, signature),
+        ]:
+            response = self.client.post(url, data={"token": invalid_token}, format="json")
+            self.assertEqual(response.data["message"], "token is invalid or expired")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CourseStatsViewTest(BaseViewTest):
+    """
+        Tests for the courses/:name/stats/ endpoint
+    """
+
+    def setUp(self):
+        super(CourseStatsViewTest, self).setUp()
+
+        # adding test data
+        self.course = self.create_course("Programming", teachers=[self.teacher])
+        other_student = BaseViewTest.create_student(
+            student_id=BaseViewTest.get_random_student_ids(1)[0],
+            first_name="George",
+            last_name="Smith",
+        )
+        conference = self.create_class_type("Conference")
+        lab_lesson = self.create_class_type("Lab Lesson")
+        dates = [datetime.date.today() - datetime.timedelta(days=days) for days in range(3)]
+        attendances = [
+            (self.student, dates[0], conference),
+            (other_student, dates[1], conference),
+            (other_student, dates[1], lab_lesson),
+            (self.student, dates[2], conference),
+        ]
+        for student, date, class_type in attendances:
+            self.create_attendance(student, self.teacher, date, self.course, class_type)
+
+    def test_get_course_stats_no_course_teacher(self):
+        """
+            This test ensures that only the course teachers can get its stats
+        """
+
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        response = self.make_request("courses-stats", name=self.course.course_name)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_get_course_stats_of_a_course_that_does_not_exist(self):
+        """
+            This test try to get the stats of a course that doesn't exists
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        response = self.make_request("courses-stats", name="Invalid course")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_course_stats(self):
+        """
+            This test ensures that the course stats count the course attendances
+            per class type, date and student
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        response = self.make_request("courses-stats", name=self.course.course_name)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total"], 4)
+        self.assertEqual(response.data["class_types"], [
+            {"class_type": "Conference", "count": 3},
+            {"class_type": "Lab Lesson", "count": 1}
+        ])
+        self.assertEqual(
+            [date["count"] for date in response.data["dates"]],
+            [1, 2, 1]
+        )
+        students = {student["student_id"]: student for student in response.data["students"]["results"]}
+        self.assertEqual(response.data["students"]["count"], 2)
+        self.assertEqual(students[self.student.username]["count"], 2)
+        self.assertEqual(students[self.student.username]["student_name"], self.student.get_full_name())
+
+
+class UsersImportViewTest(BaseViewTest):
+    """
+        Tests for the users/import/ endpoint
+    """
+
+    def test_import_users_no_teacher_user(self):
+        """
+            This test ensures that a not teacher user can't import students
+        """
+
+        self.login_client(username=self.student.username, password=self.student.username)
+
+        students = [{"student_id": BaseViewTest.get_random_student_ids(1)[0], "first_name": "New", "last_name": "Student"}]
+        response = self.make_request("users-import", kind="post", data=students)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_users_with_invalid_data(self):
+        """
+            This test ensures that students can't be imported if the request
+            data isn't a list
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        response = self.make_request("users-import", kind="post", data={})
+        self.assertEqual(response.data["message"], "a list of students is required to import students")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_users(self):
+        """
+            This test ensures that new students are created, changed names are
+            updated and every row is reported
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        new_student_id = BaseViewTest.get_random_student_ids(1)[0]
+        students = [
+            {"student_id": new_student_id, "first_name": "New", "last_name": "Student"},
+            {"student_id": self.student.username, "first_name": "Janet", "last_name": "Doe"},
+            {"student_id": "invalid", "first_name": "Invalid", "last_name": "Student"},
+            {"student_id": new_student_id, "first_name": "New", "last_name": "Student"},
+        ]
+        response = self.make_request("users-import", kind="post", data=students)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["status"] for row in response.data],
+            ["created", "updated", "invalid", "invalid"]
+        )
+        self.assertEqual(response.data[2]["message"], "student_id is invalid")
+        self.assertEqual(response.data[3]["message"], "student_id is duplicated")
+
+        new_student = Users.objects.get(username=new_student_id)
+        self.assertEqual(new_student.get_full_name(), "New Student")
+        self.assertFalse(new_student.has_usable_password())
+        self.assertEqual(Users.objects.get(username=self.student.username).first_name, "Janet")
+
+    def test_import_users_csv(self):
+        """
+            This test ensures that students can be imported from a csv
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        student_ids = BaseViewTest.get_random_student_ids(2)
+        students = "student_id,first_name,last_name\r\n" + "".join(
+            "{},New,Student\r\n".format(student_id) for student_id in student_ids + [self.student.username]
+        )
+        response = self.client.post(
+            reverse("users-import", kwargs={"version": "v1"}),
+            data=students,
+            content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["status"] for row in response.data], ["created", "created", "updated"])
+        self.assertEqual(Users.objects.filter(username__in=student_ids).count(), 2)
+
+    def test_import_users_csv_with_bom(self):
+        """
+            This test ensures that students can be imported from a csv
+            starting with a UTF-8 BOM
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+
+        student_ids = BaseViewTest.get_random_student_ids(1)
+        students = "\ufeffstudent_id,first_name,last_name\r\n{},New,Student\r\n".format(student_ids[0])
+        response = self.client.post(
+            reverse("users-import", kwargs={"version": "v1"}),
+            data=students.encode("utf-8"),
+            content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["status"] for row in response.data], ["created"])
+        self.assertTrue(Users.objects.filter(username=student_ids[0]).exists())
+
+
+class AuthLoginUserTest(BaseViewTest):
+    """
+        Tests for the auth/login/ endpoint
+    """
+
+    def test_login_user_with_invalid_credentials(self):
+        """
+            Test login user with invalid credentials
+        """
+
+        user_data = {
+            "username": "anonymous",
+            "password": "pass"
+        }
+        response = self.make_request("auth-login", kind="post", data=user_data)
+        # assert status code is 401 UNAUTHORIZED
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_login_user(self):
@@ -1155,11 +2329,171 @@ class AuthLoginUserTest(BaseViewTest):
             "password": self.student.username
         }
         response = self.make_request("auth-login", kind="post", data=user_data)
-        # assert token key exists
+        # assert token keys exists
         self.assertIn("token", response.data)
+        self.assertIn("refresh_token", response.data)
         # assert status code is 200 OK
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_login_user_token_claims(self):
+        """
+            Test the login token carries the user role and taught courses
+        """
+
+        course = self.create_course("Programming", teachers=[self.teacher])
+        user_data = {
+            "username": self.teacher.username,
+            "password": "testing"
+        }
+        response = self.make_request("auth-login", kind="post", data=user_data)
+        payload = api_settings.JWT_DECODE_HANDLER(response.data["token"])
+        self.assertEqual(payload["user_id"], self.teacher.id)
+        self.assertEqual(payload["role"], "teacher")
+        self.assertEqual(payload["teaching"], [course.id])
+
+    def test_login_user_token_claims_revoked(self):
+        """
+            Test only the tokens issued before a revocation are revoked, even
+            in the same second
+        """
+
+        payload = api_settings.JWT_PAYLOAD_HANDLER(self.teacher)
+        with mock.patch("time.time", return_value=payload["iat"] + 0.1):
+            revoked_tokens.revoke(self.teacher.pk)
+        self.assertTrue(revoked_tokens.is_revoked(payload))
+
+        with mock.patch("time.time", return_value=payload["iat"] + 0.2):
+            payload = api_settings.JWT_PAYLOAD_HANDLER(self.teacher)
+        self.assertFalse(revoked_tokens.is_revoked(payload))
+
+        user_data = {
+            "username": self.teacher.username,
+            "password": "testing"
+        }
+        response = self.make_request("auth-login", kind="post", data=user_data)
+        payload = api_settings.JWT_DECODE_HANDLER(response.data["token"])
+        self.assertFalse(revoked_tokens.is_revoked(payload))
+
+
+class AuthRefreshTokenTest(BaseViewTest):
+    """
+        Tests for the auth/refresh/ endpoint
+    """
+
+    def login(self):
+        user_data = {
+            "username": self.student.username,
+            "password": self.student.username
+        }
+        return self.make_request("auth-login", kind="post", data=user_data).data
+
+    def test_refresh_token_with_invalid_data(self):
+        """
+            Test refresh a token without a refresh token
+        """
+
+        response = self.make_request("auth-refresh", kind="post", data={})
+        self.assertEqual(response.data["message"], "refresh_token is required to refresh a token")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_with_invalid_refresh_token(self):
+        """
+            Test refresh a token with an unknown refresh token
+        """
+
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_with_expired_access_token(self):
+        """
+            Test refresh a token while sending the expired access token
+        """
+
+        tokens = self.login()
+
+        payload = api_settings.JWT_PAYLOAD_HANDLER(self.student)
+        payload["exp"] = datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + api_settings.JWT_ENCODE_HANDLER(payload))
+
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("token", response.data)
+
+    def test_refresh_token(self):
+        """
+            Test refresh a token rotates the refresh token without checking
+            the user password
+        """
+
+        tokens = self.login()
+
+        with mock.patch("django.contrib.auth.base_user.check_password") as check_password:
+            response = self.make_request("auth-refresh", kind="post", data={"refresh_token": tokens["refresh_token"]})
+        check_password.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("token", response.data)
+        self.assertNotEqual(response.data["refresh_token"], tokens["refresh_token"])
+
+        payload = api_settings.JWT_DECODE_HANDLER(response.data["token"])
+        self.assertEqual(payload["user_id"], self.student.id)
+
+    def test_refresh_token_reused(self):
+        """
+            Test reusing a rotated refresh token revokes every token rotated
+            from the same login
+        """
+
+        tokens = self.login()
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": tokens["refresh_token"]})
+        rotated_refresh_token = response.data["refresh_token"]
+
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(response.data["message"], "refresh token has already been used")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": rotated_refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_rotations(self):
+        """
+            Test the refresh tokens rotated from a login expire with the
+            first one and only the last used one is kept
+        """
+
+        refresh_token = self.login()["refresh_token"]
+        token = RefreshTokens.objects.get(token_hash=RefreshTokens.hash_token(refresh_token))
+
+        for _ in range(3):
+            response = self.make_request("auth-refresh", kind="post", data={"refresh_token": refresh_token})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            refresh_token = response.data["refresh_token"]
+
+        tokens = RefreshTokens.objects.filter(family=token.family)
+        self.assertEqual(sorted(tokens.values_list("used", flat=True)), [False, True])
+        self.assertEqual(set(tokens.values_list("expires", flat=True)), {token.expires})
+
+    def test_refresh_token_password_changed_or_user_deactivated(self):
+        """
+            Test changing the password or deactivating the user revokes its
+            refresh tokens
+        """
+
+        refresh_token = self.login()["refresh_token"]
+        self.student.set_password("new password")
+        self.student.save()
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.student.set_password(self.student.username)
+        self.student.save()
+        refresh_token = self.login()["refresh_token"]
+        self.student.is_active = False
+        self.student.save()
+        self.student.is_active = True
+        self.student.save()
+        response = self.make_request("auth-refresh", kind="post", data={"refresh_token": refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class AuthRegisterUserTest(BaseViewTest):
     """
@@ -1216,3 +2550,146 @@ class AuthRegisterUserTest(BaseViewTest):
         self.assertEqual(user.email, email)
         self.assertEqual(user.first_name, "New")
         self.assertEqual(user.last_name, "User")
+
+
+@override_settings(SERVER_TIMING=dict(settings.SERVER_TIMING, ENABLED=True))
+class ServerTimingMiddlewareTest(BaseViewTest):
+    """
+        Tests for the per-request timing instrumentation
+    """
+
+    def setUp(self):
+        super(ServerTimingMiddlewareTest, self).setUp()
+
+        # adding test data
+        course = self.create_course("Programming", teachers=[self.teacher])
+        class_type = self.create_class_type("Conference")
+        self.create_attendance(self.student, self.teacher, datetime.date.today(), course, class_type)
+
+    def test_server_timing_header(self):
+        """
+            This test ensures that the responses have a Server-Timing header
+            with the time of each phase, the number of queries and the view
+        """
+
+        with self.assertLogs("attendance.timing", level="INFO"):
+            self.login_client(self.teacher.username, 'testing')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.make_request("attendances-list-create")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = [metric.strip().split(";") for metric in response["Server-Timing"].split(",")]
+        self.assertEqual([metric[0] for metric in metrics], ["total", "db", "auth", "serializer", "view"])
+        self.assertIn('desc="{} queries"'.format(len(queries)), metrics[1])
+        self.assertEqual(metrics[4][1], 'desc="ListCreateAttendancesView"')
+
+    def test_server_timing_log(self):
+        """
+            This test ensures that the timings of every request are logged
+            as fields of the log record
+        """
+
+        with self.assertLogs("attendance.timing", level="INFO") as logs:
+            self.login_client(self.teacher.username, 'testing')
+            self.make_request("courses-detail", name="Programming")
+        record = logs.records[-1]
+        self.assertEqual(record.view, "CoursesDetailView")
+        self.assertEqual(record.status, status.HTTP_200_OK)
+        self.assertGreater(record.queries, 0)
+        self.assertGreaterEqual(record.total_ms, record.db_ms)
+        self.assertGreater(record.serializer_ms, 0)
+
+    @override_settings(SERVER_TIMING=dict(settings.SERVER_TIMING, ENABLED=False))
+    def test_server_timing_disabled(self):
+        """
+            This test ensures that requests aren't timed when the
+            instrumentation is disabled
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+        response = self.make_request("attendances-list-create")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProfilingMiddlewareTest(BaseViewTest):
+    """
+        Tests for the on-demand request profiling and the profiles/ endpoints
+    """
+
+    def setUp(self):
+        super(ProfilingMiddlewareTest, self).setUp()
+
+        self.admin = BaseViewTest.create_teacher(
+            teacher_email="admin@matcom.uh.cu",
+            first_name="Ada",
+            last_name="Admin",
+        )
+        self.admin.is_staff = True
+        self.admin.save()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(profile_store, "directory", directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_profile_request(self):
+        """
+            This test ensures that the requests of admin users with the
+            profile flag are profiled, and their profiles can be listed and
+            downloaded
+        """
+
+        self.login_client(self.admin.username, 'testing')
+        url = reverse("class_types-list-create", kwargs={"version": "v1"})
+        response = self.client.get(url + "?profile=memory")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response["X-Profile-Id"]
+
+        response = self.make_request("profiles-list")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["id"], profile_id)
+        self.assertEqual(response.data[0]["view"], "ListCreateClassTypesView")
+        self.assertEqual(set(response.data[0]["downloads"]), {"prof", "snapshot"})
+
+        response = self.client.get(reverse(
+            "profiles-download", kwargs={"version": "v1", "profile": profile_id, "kind": "prof"}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with tempfile.NamedTemporaryFile() as prof:
+            prof.write(b"".join(response.streaming_content))
+            prof.flush()
+            self.assertTrue(pstats.Stats(prof.name).total_calls > 0)
+
+    def test_profile_request_not_admin(self):
+        """
+            This test ensures that the requests of users that aren't admins
+            aren't profiled, and they can't list the profiles
+        """
+
+        self.login_client(self.teacher.username, 'testing')
+        response = self.client.get(
+            reverse("class_types-list-create", kwargs={"version": "v1"}), HTTP_X_PROFILE="cpu"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(profile_store.list(), [])
+
+        response = self.make_request("profiles-list")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_profiles_ring(self):
+        """
+            This test ensures that only the most recent profiles are kept
+        """
+
+        self.login_client(self.admin.username, 'testing')
+        with mock.patch.object(profile_store, "max_profiles", 2):
+            profile_ids = [
+                self.client.get(
+                    reverse("class_types-list-create", kwargs={"version": "v1"}), HTTP_X_PROFILE="cpu"
+                )["X-Profile-Id"]
+                for _ in range(3)
+            ]
+        self.assertEqual([profile["id"] for profile in profile_store.list()], profile_ids[:0:-1])
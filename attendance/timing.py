@@ -0,0 +1,62 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# timing of the request being handled, None when it isn't instrumented
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    """
+        Time spent by a request in each of its phases (auth, db, serializer)
+        and the number of queries it made. It's a database execute_wrapper
+        timing every query.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.queries = 0
+        self.view = None
+        self._active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        with self.measure('db'):
+            return execute(sql, params, many, context)
+
+    @contextmanager
+    def measure(self, name):
+        # nested measures of a phase (e.g. nested serializers) count once
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(name)
+            self.durations[name] = self.durations.get(name, 0) + time.perf_counter() - started
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def timed(name):
+    """
+        Decorator adding the time spent in the decorated function to the name
+        phase of the current request timing, if any.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timing = current_timing.get()
+            if timing is None:
+                return function(*args, **kwargs)
+            with timing.measure(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
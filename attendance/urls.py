@@ -4,14 +4,30 @@ from .views import *
 
 urlpatterns = [
     path('auth/login/', LoginView.as_view(), name="auth-login"),
+    path('auth/refresh/', RefreshTokenView.as_view(), name="auth-refresh"),
     path('auth/register/', RegisterUsersView.as_view(), name="auth-register"),
 
+    path('users/import/', ImportUsersView.as_view(), name="users-import"),
+
+    path('cache/stats/', CacheStatsView.as_view(), name="cache-stats"),
+
+    path('profiles/', ProfilesView.as_view(), name="profiles-list"),
+    path('profiles/<str:profile>/<str:kind>/', ProfilesDownloadView.as_view(), name="profiles-download"),
+
     path('class_types/', ListCreateClassTypesView.as_view(), name="class_types-list-create"),
     path('class_types/<str:type>/', ClassTypesDetailView.as_view(), name="class_types-detail"),
 
     path('courses/', ListCreateCoursesView.as_view(), name="courses-list-create"),
     path('courses/<str:name>/', CoursesDetailView.as_view(), name="courses-detail"),
+    path('courses/<str:name>/stats/', CourseStatsView.as_view(), name="courses-stats"),
 
     path('attendances/', ListCreateAttendancesView.as_view(), name="attendances-list-create"),
-    path('attendances/<int:id>/', AttendancesDetailView.as_view(), name="attendances-detail")
+    path('attendances/export/', ExportAttendancesView.as_view(), name="attendances-export"),
+    path('attendances/batch/', BatchCreateAttendancesView.as_view(), name="attendances-batch-create"),
+    path('attendances/receipts/<str:receipt>/', AttendanceReceiptsDetailView.as_view(), name="attendances-receipts-detail"),
+    path('attendances/<int:id>/', AttendancesDetailView.as_view(), name="attendances-detail"),
+
+    path('sessions/', CreateClassSessionsView.as_view(), name="sessions-create"),
+    path('sessions/check_in/', CheckInClassSessionsView.as_view(), name="sessions-check-in"),
+    path('sessions/<str:session>/', ClassSessionsDetailView.as_view(), name="sessions-detail"),
 ]
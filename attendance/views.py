@@ -1,13 +1,31 @@
+import os
+import queue
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.urls import reverse
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import generics, permissions
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.views import status
 from rest_framework_jwt.settings import api_settings
 
+from .authentication import revoked_tokens
+from .cache import class_types_cache, courses_cache
 from .decorators import *
+from .ingest import ingest_queue, record_attendance_scans
 from .models import *
+from .pagination import *
+from .parsers import *
 from .permissions import *
+from .profiling import profile_store
+from .renderers import *
 from .serializers import *
+from .sessions import class_sessions, get_class_session_data
 
 # Get the JWT settings
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
@@ -33,16 +51,64 @@ class LoginView(generics.CreateAPIView):
             # login saves the user’s ID in the session,
             # using Django’s session framework.
             login(request, user)
+            RefreshTokens.objects.filter(user=user, expires__lte=timezone.now()).delete()
             serializer = TokenSerializer(data={
                 # using drf jwt utility functions to generate a token
                 "token": jwt_encode_handler(
                     jwt_payload_handler(user)
-                )})
+                ),
+                "refresh_token": RefreshTokens.create_token(user)
+            })
             serializer.is_valid()
             return Response(serializer.data)
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
 
+class RefreshTokenView(generics.CreateAPIView):
+    """
+        POST auth/refresh/
+    """
+
+    # the client may still send its expired access token, which the JWT
+    # authentication would reject before reaching the refresh token
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    queryset = RefreshTokens.objects.all()
+
+    @validate_refresh_token_request_data
+    def post(self, request, *args, **kwargs):
+        refresh_token = request.data["refresh_token"]
+        try:
+            token = self.queryset.select_related("user").get(
+                token_hash=RefreshTokens.hash_token(refresh_token)
+            )
+        except RefreshTokens.DoesNotExist:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+
+        # a rotated token used again may have been stolen, so every token of
+        # its family is revoked (the conditional update handles concurrent reuse)
+        if token.used or not self.queryset.filter(pk=token.pk, used=False).update(used=True):
+            token.revoke_family()
+            return Response(
+                data={
+                    "message": "refresh token has already been used"
+                },
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        if token.revoked or token.is_expired or not token.user.is_active:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+
+        serializer = TokenSerializer(data={
+            "token": jwt_encode_handler(
+                jwt_payload_handler(token.user)
+            ),
+            "refresh_token": token.rotate()
+        })
+        serializer.is_valid()
+        return Response(serializer.data)
+
+
 class RegisterUsersView(generics.CreateAPIView):
     """
         POST auth/register/
@@ -75,6 +141,117 @@ class RegisterUsersView(generics.CreateAPIView):
         )
 
 
+class CacheStatsView(generics.GenericAPIView):
+    """
+        GET cache/stats/
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            "courses": courses_cache.stats(),
+            "class_types": class_types_cache.stats()
+        })
+
+
+class ProfilesView(generics.GenericAPIView):
+    """
+        GET profiles/
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        profiles = profile_store.list()
+        for profile in profiles:
+            profile["downloads"] = {
+                kind: request.build_absolute_uri(reverse(
+                    "profiles-download",
+                    kwargs={"version": kwargs["version"], "profile": profile["id"], "kind": kind}
+                ))
+                for kind in profile["files"]
+            }
+        return Response(profiles)
+
+
+class ProfilesDownloadView(generics.GenericAPIView):
+    """
+        GET profiles/:id/:kind/
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        path = profile_store.get_path(kwargs["profile"], kwargs["kind"])
+        if path is None:
+            return Response(
+                data={
+                    "message": "Profile with id: \"{}\" has no {} file".format(kwargs["profile"], kwargs["kind"])
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path))
+
+
+class ImportUsersView(generics.CreateAPIView):
+    """
+        POST users/import/
+    """
+
+    queryset = Users.objects.all()
+    permission_classes = (IsTeacherUser,)
+    parser_classes = (JSONParser, CSVParser)
+
+    max_import_size = 10000
+
+    @validate_users_import_request_data
+    def post(self, request, *args, **kwargs):
+        first_name_max_length = Users._meta.get_field("first_name").max_length
+        last_name_max_length = Users._meta.get_field("last_name").max_length
+
+        report = []
+        students = {}
+        for row, student in enumerate(request.data, start=1):
+            if not isinstance(student, dict):
+                report.append({"row": row, "status": "invalid", "message": "student must be an object"})
+                continue
+            student_id = student.get("student_id") or ""
+            first_name = student.get("first_name") or ""
+            last_name = student.get("last_name") or ""
+            if not (isinstance(student_id, str) and isinstance(first_name, str) and isinstance(last_name, str)):
+                message = "student_id, first_name and last_name must be strings"
+            elif not (student_id and first_name and last_name):
+                message = "student_id, first_name and last_name are required to import a student"
+            elif not Users.is_valid_student_id(student_id):
+                message = "student_id is invalid"
+            elif len(first_name) > first_name_max_length or len(last_name) > last_name_max_length:
+                message = "first_name or last_name is too long"
+            elif student_id in students:
+                message = "student_id is duplicated"
+            else:
+                message = None
+                students[student_id] = (first_name, last_name)
+
+            report.append({"row": row, "student_id": student_id, "status": "invalid" if message else None})
+            if message:
+                report[-1]["message"] = message
+
+        with transaction.atomic():
+            result = Users.import_students(students)
+
+        for row in report:
+            if row["status"] is None:
+                row["status"] = result[row["student_id"]][0]
+
+        # the names embedded in the tokens of updated students are stale
+        for student_status, student_user in result.values():
+            if student_status == "updated":
+                revoked_tokens.revoke(student_user.pk)
+
+        return Response(data=report)
+
+
 class ListCreateClassTypesView(generics.ListCreateAPIView):
     """
         GET class_types/
@@ -85,6 +262,10 @@ class ListCreateClassTypesView(generics.ListCreateAPIView):
     serializer_class = ClassTypesSerializer
     permission_classes = (IsTeacherUser|ReadOnly,)
 
+    @condition_on_resource_version("class_types")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @validate_class_type_request_data
     def post(self, request, *args, **kwargs):
         class_type = request.data["class_type"]
@@ -163,20 +344,34 @@ class ClassTypesDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class ListCreateCoursesView(generics.ListCreateAPIView):
     """
-        GET courses/
+        GET courses/?search=&page=&page_size=
         POST courses/
     """
 
-    queryset = Courses.objects.all()
+    # the teachers of every course are read with a single query
+    queryset = Courses.objects.prefetch_related(Prefetch("teachers", queryset=Users.objects.only("username")))
     serializer_class = CoursesSerializer
     permission_classes = (IsTeacherUser|ReadOnly,)
+    pagination_class = CoursesPagination
+
+    def get_queryset(self):
+        courses = super().get_queryset()
+        search = self.request.query_params.get("search")
+        if search:
+            # a range of names instead of startswith, SQLite can't use the
+            # unique index of course_name for a LIKE with an ESCAPE clause
+            courses = courses.filter(course_name__gte=search, course_name__lt=search + "\U0010ffff")
+        return courses
+
+    @condition_on_resource_version("courses")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     @validate_course_request_data
     def post(self, request, *args, **kwargs):
         course_name = request.data["course_name"]
         course_details = request.data.get("course_details", "")
-        teachers = request.data.get("teachers", [])
-        teachers.append(request.user.username)
+        teachers = self.teachers + [request.user]
 
         try:
             course = Courses.objects.get(course_name=course_name)
@@ -225,8 +420,7 @@ class CoursesDetailView(generics.RetrieveUpdateDestroyAPIView):
             course = self.queryset.get(course_name=kwargs["name"])
             self.check_object_permissions(request, course)
             serializer = CoursesSerializer()
-            updated_course = serializer.update(course, request.data)
-            updated_course.teachers.add(request.user)
+            updated_course = serializer.update(course, dict(request.data.items(), teachers=self.teachers + [request.user]))
             updated_course.save()
             return Response(CoursesSerializer(updated_course).data)
         except Courses.DoesNotExist:
@@ -252,16 +446,120 @@ class CoursesDetailView(generics.RetrieveUpdateDestroyAPIView):
             )
 
 
-class ListCreateAttendancesView(generics.ListCreateAPIView):
+class CourseStatsView(generics.RetrieveAPIView):
+    """
+        GET courses/:name/stats/
     """
-        GET attendances/
+
+    queryset = Courses.objects.all()
+    permission_classes = (IsCourseTeacher&permissions.IsAuthenticated,)
+    pagination_class = CourseStatsPagination
+
+    def get(self, request, *args, **kwargs):
+        try:
+            course = self.queryset.get(course_name=kwargs["name"])
+        except Courses.DoesNotExist:
+            return Response(
+                data={
+                    "message": "Course with name: \"{}\" does not exist".format(kwargs["name"])
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+        self.check_object_permissions(request, course)
+
+        attendances = Attendances.objects.filter(course=course)
+
+        class_types = [
+            {"class_type": class_type, "count": count}
+            for class_type, count in attendances
+            .values_list("class_type__class_type")
+            .annotate(count=Count("id"))
+            .order_by("class_type__class_type")
+        ]
+
+        dates = [
+            {"date": date.isoformat(), "count": count}
+            for date, count in attendances
+            .values_list("date")
+            .annotate(count=Count("id"))
+            .order_by("date")
+        ]
+
+        students = attendances.values_list(
+            "student__username", "student__first_name", "student__last_name"
+        ).annotate(count=Count("id")).order_by("student__username")
+        students = self.paginate_queryset(students)
+        students = [
+            {
+                "student_id": student_id,
+                "student_name": "{} {}".format(first_name, last_name).strip(),
+                "count": count
+            }
+            for student_id, first_name, last_name, count in students
+        ]
+
+        return Response({
+            "course_name": course.course_name,
+            "total": sum(class_type["count"] for class_type in class_types),
+            "class_types": class_types,
+            "dates": dates,
+            "students": self.paginator.get_paginated_data(students)
+        })
+
+
+class AttendancesFilterMixin:
+    """
+        Filters the attendances by the course_name, class_type, student_id,
+        teacher, date_from and date_to query parameters. Every filter is a
+        WHERE clause on the indexed columns of the attendances table: the
+        course and the class type are looked up in their caches, and the
+        student and the teacher are subqueries by username.
+    """
+
+    def filter_attendances(self, attendances):
+        query_params = self.request.query_params
+
+        course_name = query_params.get("course_name")
+        if course_name:
+            try:
+                attendances = attendances.filter(course_id=courses_cache.get(course_name).id)
+            except Courses.DoesNotExist:
+                return attendances.none()
+        class_type = query_params.get("class_type")
+        if class_type:
+            try:
+                attendances = attendances.filter(class_type_id=class_types_cache.get(class_type).id)
+            except ClassTypes.DoesNotExist:
+                return attendances.none()
+        student_id = query_params.get("student_id")
+        if student_id:
+            attendances = attendances.filter(student_id__in=Users.objects.filter(username=student_id).values("id"))
+        teacher = query_params.get("teacher")
+        if teacher:
+            attendances = attendances.filter(teacher_id__in=Users.objects.filter(username=teacher).values("id"))
+        date_from = query_params.get("date_from")
+        if date_from:
+            attendances = attendances.filter(date__gte=date_from)
+        date_to = query_params.get("date_to")
+        if date_to:
+            attendances = attendances.filter(date__lte=date_to)
+        return attendances
+
+
+class ListCreateAttendancesView(AttendancesFilterMixin, generics.ListCreateAPIView):
+    """
+        GET attendances/?course_name=&class_type=&student_id=&teacher=&date_from=&date_to=
+        GET attendances/?since=<sync_token>
         POST attendances/
     """
 
-    queryset = Attendances.objects.all()
+    queryset = Attendances.objects.select_related("student", "teacher", "course", "class_type")
     serializer_class = AttendancesSerializer
     permission_classes = (IsCourseTeacher&permissions.IsAuthenticated,)
+    pagination_class = AttendancesCursorPagination
+    sync_pagination_class = AttendancesSyncPagination
 
+    @validate_attendance_filter_query_params
     def get(self, request, *args, **kwargs):
         user = request.user
 
@@ -270,10 +568,56 @@ class ListCreateAttendancesView(generics.ListCreateAPIView):
         teaching_courses = user.teaching.all()
         teacher_attendances = self.queryset.filter(course__in=teaching_courses)
 
-        attendances = teacher_attendances | student_attendances
+        attendances = self.filter_attendances(teacher_attendances | student_attendances)
+
+        # the rows are read as flat tuples of the serialized columns (and the
+        # id the pagination cursor needs) instead of model instances
+        rows = attendances.values_list(*ATTENDANCES_VALUES_FIELDS, "id", named=True)
+
+        if self.sync_pagination_class.sync_query_param in request.query_params:
+            return self.sync(rows)
+
+        # the token is taken before reading the first page, the changes made
+        # while the next pages are read are synced again
+        sync_token = None
+        if self.paginator.cursor_query_param not in request.query_params:
+            sync_token = self.get_sync_token()
+
+        rows = self.paginate_queryset(rows)
+        response = self.get_paginated_response(attendance_values_to_dicts(row[:-1] for row in rows))
+        if sync_token is not None:
+            response.data["sync_token"] = sync_token
+        return response
+
+    def sync(self, rows):
+        """
+            Returns the attendances created and the ones deleted after the
+            sync token, the deleted ones must be applied first.
+        """
+        user = self.request.user
+        deletions = AttendanceDeletions.objects.filter(
+            viewer_id=user.id
+        ).values_list(*ATTENDANCE_DELETIONS_VALUES_FIELDS, "id", named=True)
+
+        paginator = self.sync_pagination_class()
+        created, deleted = paginator.paginate_changes(
+            rows, deletions, self.request, self.get_teaching_ids(), Courses.objects.all()
+        )
+        return paginator.get_paginated_response(
+            attendance_values_to_dicts(row[:-1] for row in created),
+            [attendance_deletion_values_to_dict(row[:-1]) for row in deleted]
+        )
 
-        serializer = AttendancesSerializer(attendances, many=True)
-        return Response(serializer.data)
+    def get_sync_token(self):
+        last_created = Attendances.objects.order_by("-id").values_list("id", flat=True).first()
+        last_deleted = AttendanceDeletions.objects.order_by("-id").values_list("id", flat=True).first()
+        return self.sync_pagination_class().encode_token(
+            last_created or 0, last_deleted or 0, self.get_teaching_ids()
+        )
+
+    def get_teaching_ids(self):
+        # read from the database, the claims of the token may be stale
+        return self.request.user.teaching.values_list("id", flat=True)
 
     @validate_attendance_request_data
     def post(self, request, *args, **kwargs):
@@ -283,7 +627,7 @@ class ListCreateAttendancesView(generics.ListCreateAPIView):
 
         course_name = request.data["course_name"]
         try:
-            course = Courses.objects.get(course_name=course_name)
+            course = courses_cache.get(course_name)
         except Courses.DoesNotExist:
             if teacher.is_student_user:
                 return Response(
@@ -292,41 +636,143 @@ class ListCreateAttendancesView(generics.ListCreateAPIView):
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            course = Courses.get_or_cretate_course(course_name, teachers=[teacher.username])
+            course = None
         else:
             self.check_object_permissions(request, course)
 
+        # in asynchronous ingest mode the scan is recorded later in a batch
+        if settings.ATTENDANCE_INGEST["ENABLED"]:
+            return self.queue_scan(request)
+
+        if course is None:
+            course = Courses.get_or_cretate_course(course_name, teachers=[teacher])
+
         student_id = request.data["student_id"]
         student_name = request.data["student_name"]
         student = Users.get_or_create_student(student_id, student_name)
 
         class_type = request.data["class_type"]
-        class_type = ClassTypes.get_or_cretate_class_type(class_type)
+        try:
+            class_type = class_types_cache.get(class_type)
+        except ClassTypes.DoesNotExist:
+            class_type = ClassTypes.get_or_cretate_class_type(class_type)
 
         iso_date = request.data["date"]
         date = date.fromisoformat(iso_date)
         details = request.data.get("details", "")
 
-        attendance = Attendances.objects.create(
+        # a scan of an already recorded attendance is a no-op
+        attendance, created = Attendances.objects.get_or_create(
             student=student,
-            teacher=teacher,
             course=course,
             class_type=class_type,
             date=date,
-            details=details
+            defaults={
+                "teacher": teacher,
+                "details": details
+            }
         )
         return Response(
             data=AttendancesSerializer(attendance).data,
-            status=status.HTTP_201_CREATED
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def queue_scan(self, request):
+        ingest_queue.start()
+        try:
+            receipt = ingest_queue.put(request.user, dict(request.data.items()))
+        except queue.Full:
+            return Response(
+                data={
+                    "message": "too many attendances are waiting to be recorded, try again later"
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
+            )
+        return Response(
+            data={
+                "receipt": receipt
+            },
+            status=status.HTTP_202_ACCEPTED
         )
 
 
+class ExportAttendancesView(AttendancesFilterMixin, generics.ListAPIView):
+    """
+        GET attendances/export/?format=csv|ndjson
+    """
+
+    queryset = Attendances.objects.all()
+    serializer_class = AttendancesSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = (CSVRenderer, NDJSONRenderer)
+
+    chunk_size = 2000
+
+    @validate_attendance_filter_query_params
+    def get(self, request, *args, **kwargs):
+        user = request.user
+
+        student_attendances = self.queryset.filter(student=user)
+
+        teaching_courses = user.teaching.all()
+        teacher_attendances = self.queryset.filter(course__in=teaching_courses)
+
+        attendances = self.filter_attendances(teacher_attendances | student_attendances)
+
+        rows = attendances.order_by("date", "id").values_list(*ATTENDANCES_VALUES_FIELDS)
+        rows = (attendance_values_to_dict(row) for row in rows.iterator(chunk_size=self.chunk_size))
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows, AttendancesSerializer.Meta.fields),
+            content_type="{}; charset={}".format(renderer.media_type, renderer.charset)
+        )
+        response["Content-Disposition"] = "attachment; filename=\"attendances.{}\"".format(renderer.format)
+        return response
+
+
+class BatchCreateAttendancesView(generics.CreateAPIView):
+    """
+        POST attendances/batch/
+    """
+
+    queryset = Attendances.objects.all()
+    serializer_class = AttendancesSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    max_batch_size = 1000
+
+    @validate_batch_attendance_request_data
+    def post(self, request, *args, **kwargs):
+        return Response(data=record_attendance_scans(request.user, request.data))
+
+
+class AttendanceReceiptsDetailView(generics.RetrieveAPIView):
+    """
+        GET attendances/receipts/:receipt/
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        result = ingest_queue.get_receipt(kwargs["receipt"], request.user)
+        if result is None:
+            return Response(
+                data={
+                    "message": "Receipt: {} does not exist".format(kwargs["receipt"])
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(dict(result, receipt=kwargs["receipt"]))
+
+
 class AttendancesDetailView(generics.RetrieveAPIView):
     """
         GET attendances/:id/
     """
 
-    queryset = Attendances.objects.all()
+    queryset = Attendances.objects.select_related("student", "teacher", "course", "class_type")
     serializer_class = AttendancesSerializer
     permission_classes = ((IsAssistanceOwner|IsCourseTeacher)&permissions.IsAuthenticated,)
 
@@ -342,3 +788,139 @@ class AttendancesDetailView(generics.RetrieveAPIView):
                 },
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class CreateClassSessionsView(generics.CreateAPIView):
+    """
+        POST sessions/
+    """
+
+    permission_classes = (IsCourseTeacher&permissions.IsAuthenticated,)
+
+    @validate_class_session_request_data
+    def post(self, request, *args, **kwargs):
+        from datetime import date
+
+        course_name = request.data["course_name"]
+        try:
+            course = courses_cache.get(course_name)
+        except Courses.DoesNotExist:
+            return Response(
+                data={
+                    "message": "course: \"{}\" does not exist".format(course_name)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        self.check_object_permissions(request, course)
+
+        session = class_sessions.open(
+            request.user,
+            course.course_name,
+            request.data["class_type"],
+            date.fromisoformat(request.data["date"]) if request.data.get("date") else date.today(),
+            details=request.data.get("details", ""),
+            duration=request.data.get("duration")
+        )
+        if session is None:
+            return Response(
+                data={
+                    "message": "too many class sessions are open, try again later"
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "60"}
+            )
+        return Response(data=get_class_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class ClassSessionsDetailView(generics.GenericAPIView):
+    """
+        GET sessions/:session/
+        DELETE sessions/:session/
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        session = class_sessions.get(kwargs["session"])
+        # only the teacher that opened the session can see its token
+        if session is None or session.teacher.pk != request.user.pk:
+            return self.session_not_found(kwargs["session"])
+        return Response(get_class_session_data(session))
+
+    def delete(self, request, *args, **kwargs):
+        session = class_sessions.get(kwargs["session"])
+        if session is None or session.teacher.pk != request.user.pk:
+            return self.session_not_found(kwargs["session"])
+        class_sessions.close(session.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def session_not_found(session_id):
+        return Response(
+            data={
+                "message": "Class session: {} does not exist".format(session_id)
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+
+class CheckInClassSessionsView(generics.CreateAPIView):
+    """
+        POST sessions/check_in/
+    """
+
+    permission_classes = (IsStudentUser&permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        # the token is verified against the in-memory sessions, with a user
+        # built from the token claims a check-in doesn't read the database
+        session = class_sessions.verify(request.data.get("token"))
+        if session is None:
+            return Response(
+                data={
+                    "message": "token is invalid or expired"
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        student = request.user
+        if not class_sessions.check_in(session, student.username):
+            return Response(
+                data={
+                    "message": "already checked in"
+                },
+                status=status.HTTP_200_OK
+            )
+
+        # the check-ins are recorded in batches as attendances scanned by
+        # the teacher of the session, a check-in that isn't recorded can be
+        # retried
+        def check_out(result):
+            if result["status"] not in (status.HTTP_200_OK, status.HTTP_201_CREATED):
+                class_sessions.check_out(session, student.username)
+
+        ingest_queue.start()
+        try:
+            ingest_queue.put(session.teacher, {
+                "student_id": student.username,
+                "student_name": [student.first_name, student.last_name],
+                "course_name": session.course_name,
+                "class_type": session.class_type,
+                "date": session.date.isoformat(),
+                "details": session.details
+            }, on_result=check_out)
+        except queue.Full:
+            class_sessions.check_out(session, student.username)
+            return Response(
+                data={
+                    "message": "too many attendances are waiting to be recorded, try again later"
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
+            )
+        return Response(
+            data={
+                "message": "checked in"
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
@@ -0,0 +1,124 @@
+"""
+Compares the latency of the hot endpoints between the WSGI (gunicorn sync
+worker) and the ASGI (gunicorn uvicorn worker) deployments while slow
+requests are being served.
+
+Both servers run against the database configured by DJANGO_SETTINGS_MODULE,
+which needs a user able to log in and some attendances of theirs, e.g.:
+
+    python manage.py seed_attendance
+    python benchmarks/asgi_vs_wsgi.py --username teacher0@matcom.uh.cu --password teacher
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEPLOYMENTS = {
+    "wsgi": ["gunicorn", "-w", "1", "api.wsgi"],
+    "asgi": ["gunicorn", "-w", "1", "-k", "uvicorn.workers.UvicornH11Worker", "api.asgi"],
+}
+
+
+def request(base_url, path, token=None, data=None):
+    headers = {"Host": "web", "Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = "Bearer " + token
+    body = json.dumps(data).encode() if data is not None else None
+    started = time.perf_counter()
+    with urllib.request.urlopen(urllib.request.Request(base_url + path, body, headers)) as response:
+        content = response.read()
+    return time.perf_counter() - started, content
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError("server on port {} didn't start".format(port))
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run_deployment(name, port, args):
+    command = DEPLOYMENTS[name] + ["--bind", "127.0.0.1:{}".format(port)]
+    server = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        base_url = "http://127.0.0.1:{}/api/v1/".format(port)
+        _, content = request(base_url, "auth/login/", data={"username": args.username, "password": args.password})
+        token = json.loads(content)["token"]
+
+        # slow requests keep being served while the hot requests are measured
+        stop = threading.Event()
+
+        def slow_requests():
+            while not stop.is_set():
+                request(base_url, "attendances/export/?format=csv", token)
+
+        slow_threads = [threading.Thread(target=slow_requests) for _ in range(args.slow)]
+        for thread in slow_threads:
+            thread.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            latencies = list(executor.map(
+                lambda _: request(base_url, "attendances/?page_size={}".format(args.page_size), token)[0],
+                range(args.requests)
+            ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in slow_threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "slow_requests": args.slow,
+        "throughput": round(args.requests / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=200, help="number of measured GET attendances/ requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent measured requests")
+    parser.add_argument("--slow", type=int, default=2, help="concurrent slow (export) requests in the background")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    results = {}
+    for offset, name in enumerate(DEPLOYMENTS):
+        results[name] = run_deployment(name, args.port + offset, args)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares the rows per second of the two attendance read paths: model
+instances serialized by AttendancesSerializer, and flat values_list rows
+turned into dicts by attendance_values_to_dict (GET attendances/). Both
+include fetching the rows.
+
+    python benchmarks/attendance_serializers.py --rows 1000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(database_path):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = database_path
+
+    import django
+    django.setup()
+
+
+def measure(read, repeat):
+    # the best of repeat runs
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = read()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per read, e.g. a page of attendances")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, "db.sqlite3"))
+
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+        call_command("seed_attendance", students=2000, courses=50, teachers=20, weeks=4, stdout=sys.stderr)
+
+        from attendance.models import Attendances
+        from attendance.serializers import (
+            ATTENDANCES_VALUES_FIELDS, AttendancesSerializer, attendance_values_to_dicts
+        )
+
+        queryset = Attendances.objects.order_by("date", "id")
+
+        def read_instances():
+            attendances = queryset.select_related("student", "teacher", "course", "class_type")[:args.rows]
+            return AttendancesSerializer(attendances, many=True).data
+
+        def read_values():
+            return attendance_values_to_dicts(queryset.values_list(*ATTENDANCES_VALUES_FIELDS)[:args.rows])
+
+        serializer_time, serializer_data = measure(read_instances, args.repeat)
+        values_time, values_data = measure(read_values, args.repeat)
+        assert json.loads(json.dumps(serializer_data)) == values_data
+
+    results = {
+        "rows": args.rows,
+        "serializer_rows_per_second": round(args.rows / serializer_time),
+        "values_rows_per_second": round(args.rows / values_time),
+        "speedup": round(serializer_time / values_time, 2),
+    }
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
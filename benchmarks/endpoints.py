@@ -0,0 +1,195 @@
+"""
+Latency benchmarks of the main endpoints on a synthetic dataset.
+
+Every endpoint is driven through the test client: one warm up request counts
+its queries and peak memory (tracemalloc), then --iterations timed requests
+give the latency percentiles. The results can be saved and a later run
+compared against them:
+
+    python benchmarks/endpoints.py --database /tmp/bench.sqlite3 --output baseline.json
+    python benchmarks/endpoints.py --database /tmp/bench.sqlite3 --baseline baseline.json
+
+The dataset is seeded with manage.py seed_attendance the first time --database
+is used (a temporary database otherwise) and reused afterwards. The exit status is 1 when an endpoint
+regressed more than --threshold against the baseline.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(database_path):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = database_path
+
+    import django
+    django.setup()
+
+
+def get_cases():
+    from django.db.models import Count
+    from attendance.management.commands.seed_attendance import TEACHER_PASSWORD, seed_student_id
+    from attendance.models import Attendances, Courses, Users
+
+    # the course with the most attendances
+    course = Courses.objects.annotate(count=Count("attendances")).order_by("-count", "id").first()
+    teacher = course.teachers.order_by("id").first()
+    student = Users.objects.get(id=Attendances.objects.filter(course=course).values_list("student", flat=True)[:1])
+    # new students on every run, so the scans record new attendances
+    first_student = Users.objects.count() + 10 ** 6
+    scans = (
+        {
+            "student_id": seed_student_id(first_student + index),
+            "student_name": ["New", "Student"],
+            "course_name": course.course_name,
+            "class_type": "Conferencia",
+            "date": "2021-01-04",
+        }
+        for index in itertools.count()
+    )
+
+    # (name, user, method, url, data)
+    return [
+        ("login", None, "post", "/api/v1/auth/login/",
+            lambda: {"username": teacher.username, "password": TEACHER_PASSWORD}),
+        ("attendances_list_teacher", teacher, "get", "/api/v1/attendances/", None),
+        ("attendances_list_student", student, "get", "/api/v1/attendances/", None),
+        ("attendances_scan", teacher, "post", "/api/v1/attendances/", lambda: next(scans)),
+        ("class_types_list", teacher, "get", "/api/v1/class_types/", None),
+        ("course_detail", teacher, "get", "/api/v1/courses/{}/".format(course.course_name), None),
+        ("course_stats", teacher, "get", "/api/v1/courses/{}/stats/".format(course.course_name), None),
+    ]
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run_case(user, method, url, data, iterations):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from rest_framework_jwt.settings import api_settings
+
+    client = APIClient(SERVER_NAME="web")
+    if user is not None:
+        token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user))
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + token)
+
+    def request():
+        response = getattr(client, method)(url, data=data() if data else None, format="json")
+        if response.status_code >= 400:
+            raise RuntimeError("{} {} answered {}".format(method.upper(), url, response.status_code))
+        return response
+
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        request()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # the captured queries are read from the connection log, which every
+    # request resets
+    query_count = len(queries)
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "iterations": iterations,
+        "queries": query_count,
+        "peak_memory_kb": round(peak_memory / 1024, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+        Prints the change of every metric against the baseline, returns the
+        names of the endpoints whose p95 latency or queries regressed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "queries", "peak_memory_kb"):
+            before, after = baseline[name][metric], result[metric]
+            change = (after - before) / before if before else 0
+            changes.append("{} {} -> {} ({:+.0%})".format(metric, before, after, change))
+            if metric in ("p95_ms", "queries") and change > threshold:
+                regressions.append(name)
+        print("{}: {}".format(name, ", ".join(changes)), file=sys.stderr)
+    return sorted(set(regressions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="SQLite database of the dataset, built if it doesn't exist")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--courses", type=int, default=400)
+    parser.add_argument("--weeks", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=100, help="timed requests per endpoint")
+    parser.add_argument("--output", help="file the results are saved to")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed p95 and queries increase")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = args.database or os.path.join(directory, "db.sqlite3")
+        build = not os.path.exists(database_path)
+        setup_django(database_path)
+
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+        if build:
+            call_command(
+                "seed_attendance", students=args.students, teachers=args.teachers, courses=args.courses,
+                weeks=args.weeks, stdout=sys.stderr
+            )
+
+        from attendance.models import Attendances, Users
+        results = {
+            "dataset": {
+                "users": Users.objects.count(),
+                "attendances": Attendances.objects.count(),
+            },
+            "endpoints": {
+                name: run_case(user, method, url, data, args.iterations)
+                for name, user, method, url, data in get_cases()
+            },
+        }
+
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results["endpoints"], json.load(baseline)["endpoints"], args.threshold)
+        if regressions:
+            print("regressed: {}".format(", ".join(regressions)), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measures the attendance write throughput of several processes writing to the
+same SQLite database, with the untuned settings (the stock backend, rollback
+journal, a new connection per request) and with the tuned ones (api.sqlite3
+with its OPTIONS, persistent connections). Every write records one scan in
+its own transaction, like POST attendances/ does.
+
+    python benchmarks/sqlite_writes.py --processes 4 --writes 250
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+COURSE_NAME = "Benchmark"
+TEACHER_USERNAME = "benchmark@matcom.uh.cu"
+START_DATE = date(2020, 1, 1)
+CLASS_SIZE = 50
+
+
+def setup_django(database_path, tuned):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+    from django.conf import settings
+
+    database = settings.DATABASES["default"]
+    database["NAME"] = database_path
+    if not tuned:
+        database.update(ENGINE="django.db.backends.sqlite3", OPTIONS={})
+
+    import django
+    django.setup()
+
+
+def create_database(database_path, tuned):
+    setup_django(database_path, tuned)
+    from django.core.management import call_command
+    from attendance.models import ClassTypes, Courses, Users
+
+    call_command("migrate", verbosity=0)
+    teacher = Users.objects.create_user(username=TEACHER_USERNAME, email=TEACHER_USERNAME, password="benchmark")
+    Courses.create_courses([COURSE_NAME], teacher)
+    ClassTypes.get_or_create_class_types(["Conferencia"])
+
+
+def write_scans(database_path, tuned, worker, writes, barrier, results):
+    setup_django(database_path, tuned)
+    from django.db import OperationalError, connection
+    from attendance.ingest import record_attendance_scans
+    from attendance.models import Users
+
+    teacher = Users.objects.get(username=TEACHER_USERNAME)
+    if not tuned:
+        connection.close()
+    barrier.wait()
+
+    errors = 0
+    for index in range(writes):
+        scan = {
+            "student_id": "900101{:05d}".format(worker * writes + index),
+            "student_name": ["Student", str(index)],
+            "course_name": COURSE_NAME,
+            "class_type": "Conferencia",
+            # classes of CLASS_SIZE students
+            "date": str(START_DATE + timedelta(days=index // CLASS_SIZE)),
+        }
+        try:
+            record_attendance_scans(teacher, [scan])
+        except OperationalError:
+            errors += 1
+        if not tuned:
+            # without CONN_MAX_AGE every request opens its own connection
+            connection.close()
+    results.put(errors)
+
+
+def run(tuned, processes, writes):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "db.sqlite3")
+        setup = context.Process(target=create_database, args=(database_path, tuned))
+        setup.start()
+        setup.join()
+
+        barrier = context.Barrier(processes + 1)
+        results = context.Queue()
+        workers = [
+            context.Process(target=write_scans, args=(database_path, tuned, worker, writes, barrier, results))
+            for worker in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        started = time.perf_counter()
+        errors = sum(results.get() for _ in workers)
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+
+    total = processes * writes
+    return {
+        "processes": processes,
+        "writes": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "writes_per_second": round((total - errors) / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=250, help="writes per process")
+    args = parser.parse_args()
+
+    results = {
+        "untuned": run(False, args.processes, args.writes),
+        "tuned": run(True, args.processes, args.writes),
+    }
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()